@@ -0,0 +1,121 @@
+import csv
+import json
+import sys
+from multiprocessing import Pool
+
+import degrees
+
+
+def read_queries(filename):
+    """
+    Yield (source, target) pairs from a CSV file with one pair per line.
+    Each side may be a person_id or a name. Blank lines and lines
+    starting with # are skipped.
+    """
+    with open(filename, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                continue
+            if len(row) != 2:
+                raise ValueError(f"expected two columns, got {row!r}")
+            yield row[0].strip(), row[1].strip()
+
+
+def group_queries(queries):
+    """
+    Group (source, target) pairs by source, keeping first-seen order,
+    so that one search tree can answer every target of a source.
+    """
+    groups = dict()
+    for source, target in queries:
+        groups.setdefault(source, []).append(target)
+    return list(groups.items())
+
+
+def answer_group(group):
+    """
+    Answer every query in a (source, targets) group with a single
+    breadth first search and return a list of result dictionaries.
+    """
+    source, targets = group
+    g = degrees.current_graph()
+    source_index = degrees.indices_for(g, source)
+    target_index = {target: degrees.indices_for(g, target) for target in targets}
+
+    results = []
+    if not source_index:
+        for target in targets:
+            results.append({"source": source, "target": target, "error": "Person not found."})
+        return results
+
+    # People with no movies can only be reached as a source, so waiting
+    # for them would force a search of the whole component
+    offsets = g.person_offsets
+    wanted = set(
+        t for t in set().union(*target_index.values())
+        if offsets[t + 1] > offsets[t]
+    )
+    parents, explored = degrees.search_tree(g, source_index, wanted)
+    for target in targets:
+        result = {"source": source, "target": target}
+        if not target_index[target]:
+            result["error"] = "Person not found."
+            results.append(result)
+            continue
+        reached = [t for t in target_index[target] if t in parents]
+        if not reached:
+            result["degrees"] = None
+            result["path"] = None
+            results.append(result)
+            continue
+        solution = min((degrees.tree_path(parents, t) for t in reached), key=len)
+        result["degrees"] = len(solution)
+        result["path"] = [[g.movie_keys[j], g.person_keys[k]] for j, k in solution]
+        results.append(result)
+    return results
+
+
+def init_worker(directory, use_snapshot, skip_isolated):
+    """
+    Load the data in a worker process, unless it was inherited from
+    the parent. With a snapshot, every worker maps the same pages.
+    """
+    if degrees.graph is None:
+        degrees.load_data(directory, use_snapshot=use_snapshot, skip_isolated=skip_isolated)
+        degrees.current_graph()
+
+
+def run_batch(filename, directory, output=None, processes=None,
+              use_snapshot=True, rebuild=False, skip_isolated=False):
+    """
+    Answer every query in `filename` against the data in `directory`,
+    writing one JSON object per line to `output` as groups finish.
+    """
+    output = output or sys.stdout
+    degrees.load_data(directory, use_snapshot=use_snapshot, rebuild=rebuild,
+                      skip_isolated=skip_isolated)
+    degrees.current_graph()
+    groups = group_queries(read_queries(filename))
+
+    if processes == 1:
+        results = map(answer_group, groups)
+        write_results(results, output)
+        return
+
+    with Pool(processes, initializer=init_worker,
+              initargs=(directory, use_snapshot, skip_isolated)) as pool:
+        results = pool.imap_unordered(answer_group, groups)
+        write_results(results, output)
+
+
+def write_results(results, output):
+    for group in results:
+        for result in group:
+            output.write(json.dumps(result) + "\n")
+        output.flush()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python batch.py queries.csv [directory]")
+    run_batch(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else "large")
@@ -0,0 +1,223 @@
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import tempfile
+
+import degrees
+import paths
+from util import HashedQueueFrontier
+
+# Query pairs over the `small` directory
+SMALL_QUERIES = [
+    ("kevin bacon", "tom cruise"),
+    ("kevin bacon", "chris sarandon"),
+    ("tom hanks", "valeria golino"),
+    ("emma watson", "kevin bacon"),
+    ("jack nicholson", "sally field"),
+    ("gerald r. molen", "demi moore"),
+]
+
+# Strategy name -> keyword arguments for degrees.search
+STRATEGIES = {
+    "bidirectional": {"strategy": "bidirectional"},
+    "landmarks": {"strategy": "landmarks"},
+    "path-bfs": {"strategy": "path", "frontier": HashedQueueFrontier},
+}
+
+
+def write_synthetic(directory, num_people, num_movies, cast_size=8, seed=0):
+    """
+    Write people.csv, movies.csv and stars.csv for a random cast graph.
+    Casts draw a quarter of their members from a small pool of popular
+    people, so degrees follow a skewed distribution like real credits.
+    """
+    rng = random.Random(seed)
+    stars_pool = max(1, num_people // 100)
+    with open(os.path.join(directory, "people.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(num_people):
+            writer.writerow([f"p{i}", f"Person {i}", 1900 + i % 100])
+    with open(os.path.join(directory, "movies.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for j in range(num_movies):
+            writer.writerow([f"m{j}", f"Movie {j}", 1950 + j % 70])
+    with open(os.path.join(directory, "stars.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for j in range(num_movies):
+            for _ in range(rng.randint(1, cast_size)):
+                if rng.random() < 0.25:
+                    i = rng.randrange(stars_pool)
+                else:
+                    i = rng.randrange(num_people)
+                writer.writerow([f"p{i}", f"m{j}"])
+
+
+def random_queries(count, seed=0):
+    """
+    Return `count` (source, target) pairs drawn from the loaded data.
+    """
+    rng = random.Random(seed)
+    keys = degrees.current_graph().person_keys
+    return [
+        (keys[rng.randrange(len(keys))], keys[rng.randrange(len(keys))])
+        for _ in range(count)
+    ]
+
+
+def run(dataset, queries, strategies=STRATEGIES, trace_memory=False):
+    """
+    Run every query with every strategy against the loaded data and
+    return one summary row per strategy. Solutions whose length differs
+    from the first strategy's are counted as mismatches.
+    """
+    expected = None
+    rows = []
+    for name, options in strategies.items():
+        if name == "landmarks":
+            degrees.prepare_landmarks()
+        lengths = []
+        times, expanded, peaks, memory = [], [], [], []
+        for source, target in queries:
+            solution, stats = degrees.search(source, target, trace_memory=trace_memory, **options)
+            lengths.append(None if solution is None else len(solution))
+            times.append(stats.phases["total"])
+            expanded.append(stats.nodes_expanded)
+            peaks.append(stats.frontier_peak)
+            if stats.memory_peak is not None:
+                memory.append(stats.memory_peak)
+        if expected is None:
+            expected = lengths
+        rows.append({
+            "dataset": dataset,
+            "strategy": name,
+            "queries": len(queries),
+            "mean_ms": 1000 * statistics.mean(times),
+            "p95_ms": 1000 * percentile(times, 95),
+            "expanded": statistics.mean(expanded),
+            "frontier_peak": max(peaks),
+            "memory_kb": max(memory) / 1024 if memory else None,
+            "mismatches": sum(1 for a, b in zip(lengths, expected) if a != b),
+        })
+    return rows
+
+
+def simple_paths(g, source, target):
+    """
+    Return every simple path (no person or movie repeated) from person
+    index `source` to `target` by brute-force depth first enumeration.
+    """
+    found = []
+    steps = []
+
+    def walk(person, people_on, movies_on):
+        if person == target:
+            found.append(list(steps))
+            return
+        for movie in g.movies_of(person):
+            if movie in movies_on:
+                continue
+            for star in g.stars_of(movie):
+                if star in people_on:
+                    continue
+                steps.append((movie, star))
+                walk(star, people_on | {star}, movies_on | {movie})
+                steps.pop()
+
+    walk(source, {source}, set())
+    return found
+
+
+def check_paths(num_people=40, num_movies=18, pairs=20, seed=1):
+    """
+    Compare `paths.k_shortest_paths` with brute-force enumeration on a
+    small synthetic cast and return one row per (source, target) pair.
+    A pair is a mismatch unless both give the same set of paths and the
+    paths come out shortest first.
+    """
+    rng = random.Random(seed)
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        write_synthetic(directory, num_people, num_movies, cast_size=5, seed=seed)
+        degrees.load_data(directory, use_snapshot=False, compact=True)
+        g = degrees.current_graph()
+        for _ in range(pairs):
+            source, target = rng.sample(range(g.num_people), 2)
+            expected = simple_paths(g, source, target)
+            found = list(paths.k_shortest_paths(g, source, target))
+            lengths = [len(solution) for solution in found]
+            rows.append({
+                "source": g.person_keys[source],
+                "target": g.person_keys[target],
+                "expected": len(expected),
+                "found": len(found),
+                "mismatch": (sorted(map(tuple, found)) != sorted(map(tuple, expected))
+                             or lengths != sorted(lengths)),
+            })
+    return rows
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def print_table(rows, columns=None):
+    if columns is None:
+        columns = ["dataset", "strategy", "queries", "mean_ms", "p95_ms",
+                   "expanded", "frontier_peak", "memory_kb", "mismatches"]
+    cells = [[format_cell(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for r in cells:
+        print("  ".join(c.ljust(w) for c, w in zip(r, widths)))
+
+
+def format_cell(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare degrees search strategies.")
+    parser.add_argument("--small", default="small", help="directory of the small dataset")
+    parser.add_argument("--people", type=int, default=50000)
+    parser.add_argument("--movies", type=int, default=12000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory", action="store_true", help="trace peak memory per search")
+    parser.add_argument("--check-paths", action="store_true",
+                        help="check k_shortest_paths against brute force instead")
+    args = parser.parse_args()
+
+    if args.check_paths:
+        rows = check_paths(seed=args.seed + 1)
+        print_table(rows, ["source", "target", "expected", "found", "mismatch"])
+        if any(row["mismatch"] for row in rows):
+            sys.exit(1)
+        return
+
+    rows = []
+    degrees.load_data(args.small, use_snapshot=False, compact=True)
+    rows += run("small", SMALL_QUERIES, trace_memory=args.memory)
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_synthetic(directory, args.people, args.movies, seed=args.seed)
+        degrees.load_data(directory, use_snapshot=False, compact=True)
+        queries = random_queries(args.queries, args.seed)
+        rows += run("synthetic", queries, trace_memory=args.memory)
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,19 @@
+import argparse
 import csv
+import itertools
 import sys
 import os 
-from util import Node, StackFrontier, QueueFrontier
+import time
+import tracemalloc
+from util import Node, StackFrontier, QueueFrontier, SearchStats
+from util import HashedStackFrontier, HashedQueueFrontier
+from graph import Graph
+import snapshot
+import loader
+import distances
+from nameindex import NameIndex
+from landmarks import Landmarks, astar_search
+import paths
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +24,64 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed Graph of the data above, built on demand
+graph = None
+
+# Maps person_ids to a DistanceTable of separations from that person
+tables = {}
+
+# Prefix and fuzzy NameIndex over the Graph, built on demand
+name_index = None
+
+# Landmarks whose distances guide the "landmarks" search strategy
+landmark_index = None
+
 cwd = os.getcwd() + 'small'
-def load_data(directory = cwd):
+def load_data(directory = cwd, compact=False, use_snapshot=True, rebuild=False,
+              skip_isolated=False, progress=None):
     """
     Load data from CSV files into memory.
+
+    If `compact` is true, the data is streamed straight into a Graph and
+    `people`, `movies` and `names` become read-only views of it.
+    `skip_isolated` leaves out people with no movies, and `progress`
+    is passed to `loader.load_graph` to report how far loading has got.
+
+    If `use_snapshot` is true, the compiled Graph is also saved as a
+    binary snapshot next to the CSV files, and later calls memory-map
+    that snapshot instead of parsing the CSVs, unless the CSVs changed
+    or `rebuild` is true.
     """
+    global graph, names, people, movies, name_index, landmark_index
+    graph = None
+    name_index = None
+    landmark_index = None
+    tables.clear()
+    if not isinstance(people, dict):
+        names, people, movies = {}, {}, {}
+
+    if use_snapshot:
+        filename = snapshot.snapshot_path(directory)
+        options = {"skip_isolated": skip_isolated}
+        if not rebuild:
+            loaded = snapshot.load_snapshot(filename, directory, options)
+            if loaded is not None:
+                use_graph(loaded)
+                return
+        stored = snapshot.fingerprint(directory, with_hash=True)
+        compiled = loader.load_graph(directory, progress=progress, skip_isolated=skip_isolated)
+        try:
+            snapshot.save_snapshot(compiled, filename, stored, options)
+        except OSError:
+            use_graph(compiled)
+        else:
+            use_graph(snapshot.load_snapshot(filename) or compiled)
+        return
+
+    if compact:
+        use_graph(loader.load_graph(directory, progress=progress, skip_isolated=skip_isolated))
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -52,14 +117,99 @@ def load_data(directory = cwd):
                 pass
 
 
+def compile_graph(release=False):
+    """
+    Build the compact Graph from the loaded data and return it.
+    If `release` is true, the dictionaries are replaced by views
+    of the Graph so their memory can be reclaimed.
+    """
+    global graph
+    compiled = Graph.from_data(people, movies)
+    if release:
+        use_graph(compiled)
+    else:
+        graph = compiled
+    return compiled
+
+
+def use_graph(compiled):
+    """
+    Make `compiled` the loaded data, replacing the dictionaries
+    with read-only views of it.
+    """
+    global graph, names, people, movies
+    graph = compiled
+    names = graph.names_view()
+    people = graph.people_view()
+    movies = graph.movies_view()
+
+
+def current_graph():
+    """
+    Return the compact Graph, compiling it from the loaded data if needed.
+    """
+    if graph is None:
+        return compile_graph()
+    return graph
+
+
+def current_name_index():
+    """
+    Return the NameIndex for the loaded data, building it if needed.
+    """
+    global name_index
+    if name_index is None or name_index.graph is not current_graph():
+        name_index = NameIndex(current_graph())
+    return name_index
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(description="Find degrees of separation between two people.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--rebuild-snapshot", action="store_true",
+                        help="re-parse the CSV files and rewrite the binary snapshot")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="parse the CSV files without reading or writing a snapshot")
+    parser.add_argument("--skip-isolated", action="store_true",
+                        help="leave out people who starred in no movies")
+    parser.add_argument("--progress", action="store_true",
+                        help="report loading progress on stderr")
+    parser.add_argument("--strategy", default="bidirectional",
+                        choices=["bidirectional", "landmarks", "path"],
+                        help="search strategy used by shortest_path")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer every (source, target) pair in FILE as JSON lines")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="number of worker processes for --batch and --serve")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve lookups over local HTTP instead of asking for names")
+    parser.add_argument("--port", type=int, default=8765,
+                        help="TCP port on 127.0.0.1 for --serve")
+    parser.add_argument("--socket", help="Unix socket path for --serve instead of TCP")
+    args = parser.parse_args()
+    directory = args.directory
+
+    if args.batch:
+        import batch
+        batch.run_batch(args.batch, directory, processes=args.processes,
+                        use_snapshot=not args.no_snapshot,
+                        rebuild=args.rebuild_snapshot,
+                        skip_isolated=args.skip_isolated)
+        return
+
+    if args.serve:
+        import service
+        service.run_service(directory, port=args.port, socket_path=args.socket,
+                            processes=args.processes, strategy=args.strategy,
+                            use_snapshot=not args.no_snapshot,
+                            skip_isolated=args.skip_isolated)
+        return
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, use_snapshot=not args.no_snapshot, rebuild=args.rebuild_snapshot,
+              skip_isolated=args.skip_isolated,
+              progress=loader.print_progress if args.progress else None)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +219,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, strategy=args.strategy)
 
     if path is None:
         print("Not connected.")
@@ -84,10 +234,24 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def path(source, target, frontier = StackFrontier()):
+def person_ids(query):
+    """
+    Returns the set of person_ids matching `query`, which may be
+    either a person_id or a (case-insensitive) name.
+    """
+    if query in people:
+        return {query}
+    return set(names.get(query.lower(), set()))
+
+
+def path(source, target, frontier=None, stats=None):
+    if frontier is None:
+        frontier = HashedStackFrontier()
+    if stats is None:
+        stats = SearchStats()
     num_states_explored = 0
-    source_id = [n for n in names[source]]
-    target_id = set(n for n in names[target])
+    source_id = list(person_ids(source))
+    target_id = person_ids(target)
     # Create initial frontier 
     for s in source_id:
         start = Node(state = s, parent = None, action = 'person')
@@ -100,12 +264,11 @@ def path(source, target, frontier = StackFrontier()):
         
         if frontier.empty(): 
             # If no solution then express it 
-            return None 
+            return None, num_states_explored
         
+        stats.frontier(len(frontier.frontier))
         node = frontier.remove()
         num_states_explored += 1 
-        if num_states_explored % 1000 == 0: 
-            print(num_states_explored)
         
         if node.action == 'movie': 
             for star in movies[node.state]['stars']: 
@@ -114,7 +277,6 @@ def path(source, target, frontier = StackFrontier()):
                     while node.parent != None: 
                         states.append(node.state)
                         node = node.parent 
-                    actions.reverse()
                     states.reverse()
                     solution = []
                     for i in range(0,len(states),2): 
@@ -136,31 +298,402 @@ def path(source, target, frontier = StackFrontier()):
         
         for n in neighbours:
             if not frontier.contains_state(n) and n not in explored: 
-                child = Node(state= n, parent=node, action=action)
+                child = Node(state= n, parent=node, action=action, cost=node.cost + 1)
                 frontier.add(child)
                 
         
-def shortest_path(source, target): 
-    # Depth first search 
-    dfs_solution, dfs_cost = path(source, target, frontier = StackFrontier())
-    # Breadth first search 
-    bfs_solution, bfs_cost = path(source, target, frontier = QueueFrontier())
+def bidirectional_path(source, target, stats=None):
+    """
+    Breadth first search that grows one tree from the source and one
+    from the target, a whole layer at a time, always expanding the side
+    with the smaller frontier, and stops as soon as the trees meet.
+
+    Returns the (movie_id, person_id) solution and the number of people
+    expanded, or (None, count) if the two are not connected.
+    """
+    if stats is None:
+        stats = SearchStats()
+    with stats.phase("resolve"):
+        g = current_graph()
+        source_index = indices_for(g, source)
+        target_index = indices_for(g, target)
+    with stats.phase("search"):
+        solution, num_states_explored = bidirectional_search(
+            g, source_index, target_index, stats
+        )
+    if solution is None:
+        return None, num_states_explored
+    with stats.phase("reconstruct"):
+        return [
+            (g.movie_keys[j], g.person_keys[k]) for j, k in solution
+        ], num_states_explored
+
+
+def indices_for(g, query):
+    """
+    Return the Graph indices of the people matching `query`.
+    """
+    return set(g.person_index(person_id) for person_id in person_ids(query))
+
+
+def bidirectional_search(g, source_index, target_index, stats=None):
+    """
+    Bidirectional breadth first search over the Graph `g` between two
+    sets of person indices. Returns a list of (movie index, person index)
+    pairs and the number of people expanded. If `stats` is given, its
+    frontier peak is updated after every layer.
+    """
+    num_states_explored = 0
+    if not source_index or not target_index:
+        return None, num_states_explored
+    if source_index & target_index:
+        return [], num_states_explored
+
+    # Each side maps person -> (movie, person it was reached from)
+    forward = {s: None for s in source_index}
+    backward = {t: None for t in target_index}
+    forward_frontier = list(source_index)
+    backward_frontier = list(target_index)
+    forward_movies = set()
+    backward_movies = set()
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, parents, other = forward_frontier, forward, backward
+            seen_movies = forward_movies
+        else:
+            frontier, parents, other = backward_frontier, backward, forward
+            seen_movies = backward_movies
+
+        next_frontier = []
+        for person, movie, stars in g.expand(frontier, seen_movies):
+            for star in stars:
+                if star in parents:
+                    continue
+                parents[star] = (movie, person)
+                if star in other:
+                    num_states_explored += frontier.index(person) + 1
+                    return join_paths(forward, backward, star), num_states_explored
+                next_frontier.append(star)
+        num_states_explored += len(frontier)
+
+        if frontier is forward_frontier:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+        if stats is not None:
+            stats.frontier(len(forward_frontier) + len(backward_frontier))
+
+    return None, num_states_explored
+
+
+def join_paths(forward, backward, meeting):
+    """
+    Stitches the forward and backward search trees together at the
+    `meeting` person into a list of (movie, person) pairs.
+    """
+    solution = []
+    person = meeting
+    while forward[person] is not None:
+        movie, previous = forward[person]
+        solution.append((movie, person))
+        person = previous
+    solution.reverse()
+
+    person = meeting
+    while backward[person] is not None:
+        movie, person = backward[person]
+        solution.append((movie, person))
+    return solution
+
+
+def search_tree(g, source_index, targets=None):
+    """
+    Breadth first search over the Graph `g` from a set of person indices.
+
+    Returns a dictionary mapping every reached person to the
+    (movie, person) pair it was reached from, or None for the sources,
+    and the number of people expanded. If `targets` is given, the search
+    stops as soon as all of them have been reached.
+    """
+    parents = {s: None for s in source_index}
+    remaining = None if targets is None else set(targets) - parents.keys()
+    frontier = list(source_index)
+    seen_movies = set()
+    num_states_explored = 0
+
+    while frontier and remaining != set():
+        num_states_explored += len(frontier)
+        next_frontier = []
+        for person, movie, stars in g.expand(frontier, seen_movies):
+            for star in stars:
+                if star in parents:
+                    continue
+                parents[star] = (movie, person)
+                next_frontier.append(star)
+                if remaining is not None:
+                    remaining.discard(star)
+        frontier = next_frontier
+
+    return parents, num_states_explored
+
+
+def tree_path(parents, target):
+    """
+    Return the (movie, person) pairs leading from the root of a
+    `search_tree` to `target`, or None if `target` was not reached.
+    """
+    if target not in parents:
+        return None
+    solution = []
+    person = target
+    while parents[person] is not None:
+        movie, previous = parents[person]
+        solution.append((movie, person))
+        person = previous
+    solution.reverse()
+    return solution
+
+
+def distances_from(source, filename=None):
+    """
+    Runs one breadth first search from `source` over the whole graph and
+    returns a DistanceTable of the degrees of separation to every person.
+
+    If `filename` names a table saved earlier for the same source and
+    data, it is loaded instead; otherwise the new table is saved there.
+    The table is remembered so that later calls to `shortest_path` from
+    or to `source` are answered by walking the table.
+    """
+    source_id = person_ids(source)
+    if len(source_id) != 1:
+        raise ValueError(f"{source!r} does not name exactly one person")
+    source_id = source_id.pop()
+    g = current_graph()
+
+    table = None
+    if filename is not None:
+        table = distances.DistanceTable.load(filename)
+        if table is not None and (table.source != source_id or not table.matches(g)):
+            table = None
+    if table is None:
+        table = distances.distance_table(g, {g.person_index(source_id)}, source_id)
+        if filename is not None:
+            table.save(filename)
+    tables[source_id] = table
+    return table
+
+
+def table_path(source, target):
+    """
+    Answers a query from a remembered DistanceTable rooted at either end.
+    Returns (True, solution) if a table applied, else (False, None).
+    """
+    source_id = person_ids(source)
+    target_id = person_ids(target)
+    g = current_graph()
+    for s in source_id:
+        if s in tables:
+            candidates = [tables[s].path_to(g.person_index(t)) for t in target_id]
+            break
+    else:
+        for t in target_id:
+            if t in tables:
+                candidates = [tables[t].path_from(g.person_index(s)) for s in source_id]
+                break
+        else:
+            return False, None
+
+    candidates = [c for c in candidates if c is not None]
+    if not candidates:
+        return True, None
+    solution = min(candidates, key=len)
+    return True, [(g.movie_keys[j], g.person_keys[k]) for j, k in solution]
+
+
+def prepare_landmarks(k=16, method="farthest", filename=None):
+    """
+    Chooses `k` landmark people and precomputes their distances to
+    everyone, for use by the "landmarks" strategy of `shortest_path`.
+    If `filename` holds landmarks saved for the same data they are
+    loaded instead; otherwise the new landmarks are saved there.
+    """
+    global landmark_index
+    g = current_graph()
+    loaded = None
+    if filename is not None:
+        loaded = Landmarks.load(filename)
+        if loaded is not None and not loaded.matches(g):
+            loaded = None
+    if loaded is None:
+        loaded = Landmarks.build(g, k, method)
+        if filename is not None:
+            loaded.save(filename)
+    landmark_index = loaded
+    return loaded
+
+
+def landmark_path(source, target, stats=None):
+    """
+    A* search guided by landmark distances. Returns the
+    (movie_id, person_id) solution and the number of people expanded.
+    """
+    if stats is None:
+        stats = SearchStats()
+    with stats.phase("resolve"):
+        g = current_graph()
+        source_index = indices_for(g, source)
+        target_index = indices_for(g, target)
+    if landmark_index is None or not landmark_index.matches(g):
+        with stats.phase("landmarks"):
+            prepare_landmarks()
+    with stats.phase("search"):
+        solution, num_states_explored = astar_search(
+            g, landmark_index, source_index, target_index, stats
+        )
+    if solution is None:
+        return None, num_states_explored
+    with stats.phase("reconstruct"):
+        return [
+            (g.movie_keys[j], g.person_keys[k]) for j, k in solution
+        ], num_states_explored
+
+
+def shortest_path(source, target, frontier=None, strategy="bidirectional"):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target.
+
+    With the default "bidirectional" strategy the search meets in the
+    middle. The "landmarks" strategy runs A* with lower bounds from
+    `prepare_landmarks`, which expands far fewer people when the two
+    are many degrees apart. With strategy "path", `frontier` selects the frontier class
+    used by `path`; if it is None, both a depth first and a breadth first
+    search are run and the one that explored fewer states wins. Passing a
+    `frontier` with any other strategy raises a ValueError.
+
+    Queries from or to a person with a table from `distances_from` are
+    answered from that table without searching.
+    """
+    solution, stats = search(source, target, frontier, strategy)
+    return solution
+
+
+def search(source, target, frontier=None, strategy="bidirectional", trace_memory=False):
+    """
+    Runs `shortest_path` and returns its solution together with the
+    SearchStats describing the search. If `trace_memory` is true, the
+    peak memory allocated during the search is measured as well, which
+    slows the search down.
+    """
+    if frontier is not None and strategy != "path":
+        raise ValueError(f"a frontier can only be used with strategy 'path', not {strategy!r}")
+    stats = SearchStats()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        solution, stats.nodes_expanded = run_strategy(source, target, frontier, strategy, stats)
+    finally:
+        stats.phases["total"] = time.perf_counter() - start
+        if trace_memory:
+            stats.memory_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return solution, stats
+
+
+def run_strategy(source, target, frontier, strategy, stats):
+    """
+    Dispatches to the search for `strategy` and returns its solution
+    and the number of states it explored.
+    """
+    if tables:
+        with stats.phase("table"):
+            found, solution = table_path(source, target)
+        if found:
+            return solution, 0
+    if strategy == "bidirectional":
+        return bidirectional_path(source, target, stats)
+    if strategy == "landmarks":
+        return landmark_path(source, target, stats)
+    if strategy != "path":
+        raise ValueError(f"unknown strategy {strategy!r}")
+    with stats.phase("search"):
+        if frontier is not None:
+            return path(source, target, frontier(), stats)
+        # Depth first search 
+        dfs_solution, dfs_cost = path(source, target, HashedStackFrontier(), stats)
+        # Breadth first search 
+        bfs_solution, bfs_cost = path(source, target, HashedQueueFrontier(), stats)
     if bfs_cost < dfs_cost: 
-        return bfs_solution 
+        return bfs_solution, dfs_cost + bfs_cost
     else: 
-        return dfs_solution 
-    
+        return dfs_solution, dfs_cost + bfs_cost
+
+
+def all_shortest_paths(source, target):
+    """
+    Lazily yields every shortest list of (movie_id, person_id) pairs
+    connecting the source to the target, from one breadth first search.
+    """
+    g = current_graph()
+    for solution in paths.all_shortest_paths(g, indices_for(g, source), indices_for(g, target)):
+        yield [(g.movie_keys[j], g.person_keys[k]) for j, k in solution]
+
+
+def count_shortest_paths(source, target):
+    """
+    Returns how many shortest paths connect the source to the target.
+    """
+    g = current_graph()
+    return paths.count_shortest_paths(g, indices_for(g, source), indices_for(g, target))
 
 
-def person_id_for_name(name):
+def k_shortest_paths(source, target, k=None):
+    """
+    Lazily yields simple paths (no person or movie twice) of (movie_id, person_id)
+    pairs from the source to the target, shortest first, stopping after
+    `k` paths if it is given.
+    """
+    g = current_graph()
+    source_id = person_ids(source)
+    target_id = person_ids(target)
+    if len(source_id) != 1 or len(target_id) != 1:
+        raise ValueError("source and target must each name exactly one person")
+    found = paths.k_shortest_paths(
+        g, g.person_index(source_id.pop()), g.person_index(target_id.pop())
+    )
+    for solution in itertools.islice(found, k):
+        yield [(g.movie_keys[j], g.person_keys[k]) for j, k in solution]
+
+
+def person_id_for_name(name, policy="ask", fuzzy=False):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    `policy` decides between people who share a name: "ask" prompts for
+    an id, "popular" picks whoever starred in the most movies, and
+    "strict" returns None. If `fuzzy` is true and nobody has exactly
+    this name, the closest name in the name index is used instead.
     """
+    if policy not in ("ask", "popular", "strict"):
+        raise ValueError(f"unknown policy {policy!r}")
     person_ids = list(names.get(name.lower(), set()))
+    if len(person_ids) == 0 and fuzzy:
+        g = current_graph()
+        matches = current_name_index().fuzzy(name, limit=1)
+        if matches:
+            person_ids = list(g.ids_for_name(g.person_names[matches[0]]))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if policy == "popular":
+            g = current_graph()
+            index = current_name_index()
+            return max(person_ids, key=lambda p: index.popularity(g.person_index(p)))
+        if policy == "strict":
+            return None
         print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
@@ -178,11 +711,24 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def search_names(text, limit=10, max_distance=2):
+    """
+    Returns up to `limit` person_ids for autocomplete: exact name
+    matches, then names starting with `text`, then names within
+    `max_distance` typos, each ranked by number of movies.
+    """
+    g = current_graph()
+    found = current_name_index().search(text, limit, max_distance)
+    return [g.person_keys[i] for i in found]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,145 @@
+import json
+import sys
+from array import array
+
+MAGIC = b"DEGDIST\0"
+VERSION = 2
+
+
+class DistanceTable():
+    """
+    Degrees of separation from one source to every person in a Graph.
+
+    `distance[i]` is the number of movies between the source and person
+    `i`, or -1 if they are not connected. Person `i` was reached through
+    movie `via[i]` from person `predecessor[i]`, so any shortest path can
+    be read back in time proportional to its length.
+    """
+
+    def __init__(self, source, distance, via, predecessor, digest):
+        self.source = source
+        self.distance = distance
+        self.via = via
+        self.predecessor = predecessor
+        self.digest = digest
+
+    def histogram(self):
+        """
+        Return a dictionary mapping each distance to the number of
+        people at that distance. Unreachable people are counted under None.
+        """
+        counts = dict()
+        for d in self.distance:
+            key = None if d < 0 else d
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def path_to(self, target):
+        """
+        Return (movie, person) index pairs leading from the source to
+        person `target`, or None if they are not connected.
+        """
+        if self.distance[target] < 0:
+            return None
+        solution = []
+        person = target
+        while self.predecessor[person] >= 0:
+            solution.append((self.via[person], person))
+            person = self.predecessor[person]
+        solution.reverse()
+        return solution
+
+    def path_from(self, start):
+        """
+        Return (movie, person) index pairs leading from person `start`
+        back to the source, or None if they are not connected.
+        """
+        if self.distance[start] < 0:
+            return None
+        solution = []
+        person = start
+        while self.predecessor[person] >= 0:
+            solution.append((self.via[person], self.predecessor[person]))
+            person = self.predecessor[person]
+        return solution
+
+    def matches(self, g):
+        """
+        Return True if the table was built from a Graph with the same
+        links as `g`, and its source is still at the same index there.
+        """
+        if len(self.distance) != g.num_people or self.digest != g.digest():
+            return False
+        if self.source is None:
+            return True
+        i = g.person_index(self.source)
+        return i is not None and self.distance[i] == 0
+
+    def save(self, filename):
+        header = json.dumps({
+            "version": VERSION,
+            "byteorder": sys.byteorder,
+            "source": self.source,
+            "num_people": len(self.distance),
+            "digest": self.digest,
+        }).encode("utf-8")
+        with open(filename, "wb") as f:
+            f.write(MAGIC)
+            f.write(header + b"\n")
+            self.distance.tofile(f)
+            self.via.tofile(f)
+            self.predecessor.tofile(f)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read a table written by `save`, or return None if the file is
+        missing or was written by another version.
+        """
+        try:
+            with open(filename, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return None
+                header = json.loads(f.readline().decode("utf-8"))
+                if header["version"] != VERSION or header["byteorder"] != sys.byteorder:
+                    return None
+                columns = []
+                for _ in range(3):
+                    column = array("i")
+                    column.fromfile(f, header["num_people"])
+                    columns.append(column)
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+        return cls(header["source"], *columns, header["digest"])
+
+
+def distance_table(g, source_index, source=None):
+    """
+    Run one level-synchronous breadth first search over the Graph `g`
+    from the person indices in `source_index`, and return the
+    DistanceTable it produces.
+    """
+    n = g.num_people
+    distance = array("i", [-1]) * n
+    via = array("i", [-1]) * n
+    predecessor = array("i", [-1]) * n
+    seen_movies = set()
+
+    frontier = list(source_index)
+    for s in frontier:
+        distance[s] = 0
+    level = 0
+    while frontier:
+        level += 1
+        next_frontier = []
+        for person, movie, stars in g.expand(frontier, seen_movies):
+            for star in stars:
+                if distance[star] >= 0:
+                    continue
+                distance[star] = level
+                via[star] = movie
+                predecessor[star] = person
+                next_frontier.append(star)
+        frontier = next_frontier
+
+    return DistanceTable(source, distance, via, predecessor, g.digest())
@@ -0,0 +1,315 @@
+import hashlib
+from array import array
+from collections.abc import Mapping
+
+
+class Graph():
+    """
+    Compact, integer-indexed form of the people/movies graph.
+
+    Person and movie IMDB ids are interned to dense integers. Each side of
+    the bipartite graph is stored in CSR form: the movies of person `i`
+    are `person_movies[person_offsets[i]:person_offsets[i + 1]]`, and the
+    stars of movie `j` are `movie_stars[movie_offsets[j]:movie_offsets[j + 1]]`.
+    """
+
+    def __init__(self, person_keys, person_names, person_births,
+                 movie_keys, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 name_order=None, person_key_order=None, movie_key_order=None):
+        self.person_keys = person_keys
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_keys = movie_keys
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        if name_order is None:
+            name_order = array("i", sorted(
+                range(len(person_names)),
+                key=lambda i: person_names[i].lower()
+            ))
+        self.name_order = name_order
+        self.person_key_order = person_key_order
+        self.movie_key_order = movie_key_order
+        self._person_lookup = None
+        self._movie_lookup = None
+        self._digest = None
+
+    @classmethod
+    def from_data(cls, people, movies):
+        """
+        Compile a Graph from the `people` and `movies` dictionaries
+        built by `load_data`.
+        """
+        person_keys = list(people)
+        movie_keys = list(movies)
+        person_lookup = {key: i for i, key in enumerate(person_keys)}
+        movie_lookup = {key: j for j, key in enumerate(movie_keys)}
+
+        person_offsets = array("q", [0])
+        person_movies = array("i")
+        for key in person_keys:
+            person_movies.extend(sorted(
+                movie_lookup[m] for m in people[key]["movies"]
+                if m in movie_lookup
+            ))
+            person_offsets.append(len(person_movies))
+
+        movie_offsets = array("q", [0])
+        movie_stars = array("i")
+        for key in movie_keys:
+            movie_stars.extend(sorted(
+                person_lookup[p] for p in movies[key]["stars"]
+                if p in person_lookup
+            ))
+            movie_offsets.append(len(movie_stars))
+
+        graph = cls(
+            person_keys,
+            [people[key]["name"] for key in person_keys],
+            [people[key]["birth"] for key in person_keys],
+            movie_keys,
+            [movies[key]["title"] for key in movie_keys],
+            [movies[key]["year"] for key in movie_keys],
+            person_offsets, person_movies, movie_offsets, movie_stars
+        )
+        graph._person_lookup = person_lookup
+        graph._movie_lookup = movie_lookup
+        return graph
+
+    @property
+    def num_people(self):
+        return len(self.person_keys)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_keys)
+
+    def digest(self):
+        """
+        Return a hex digest of the link structure, so that tables built
+        from one Graph can tell whether they still apply to another.
+        """
+        if self._digest is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for column in (self.person_offsets, self.person_movies,
+                           self.movie_offsets, self.movie_stars):
+                digest.update(memoryview(column).cast("B"))
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    def person_index(self, person_id):
+        """
+        Return the dense index of `person_id`, or None if it is unknown.
+        """
+        if self._person_lookup is None and self.person_key_order is not None:
+            return find_key(self.person_keys, self.person_key_order, person_id)
+        if self._person_lookup is None:
+            self._person_lookup = {
+                key: i for i, key in enumerate(self.person_keys)
+            }
+        return self._person_lookup.get(person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Return the dense index of `movie_id`, or None if it is unknown.
+        """
+        if self._movie_lookup is None and self.movie_key_order is not None:
+            return find_key(self.movie_keys, self.movie_key_order, movie_id)
+        if self._movie_lookup is None:
+            self._movie_lookup = {
+                key: j for j, key in enumerate(self.movie_keys)
+            }
+        return self._movie_lookup.get(movie_id)
+
+    def movies_of(self, i):
+        """
+        Return the movie indices person `i` starred in.
+        """
+        return self.person_movies[self.person_offsets[i]:self.person_offsets[i + 1]]
+
+    def stars_of(self, j):
+        """
+        Return the person indices who starred in movie `j`.
+        """
+        return self.movie_stars[self.movie_offsets[j]:self.movie_offsets[j + 1]]
+
+    def expand(self, frontier, seen_movies):
+        """
+        Yield (person, movie, stars) for every movie of the people in
+        `frontier` that is not in the set `seen_movies`, adding it there.
+        A movie's whole cast is reached the first time it is opened, so
+        breadth first searches open each movie once, and this is the
+        step each of them repeats per level.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+        for person in frontier:
+            for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                if movie in seen_movies:
+                    continue
+                seen_movies.add(movie)
+                yield person, movie, movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]
+
+    def costars(self, i):
+        """
+        Yield (movie index, person index) pairs for everyone who
+        starred in a movie with person `i`, including `i` itself.
+        """
+        for j in self.movies_of(i):
+            for k in self.stars_of(j):
+                yield j, k
+
+    def neighbors(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        i = self.person_index(person_id)
+        if i is None:
+            raise KeyError(person_id)
+        return set(
+            (self.movie_keys[j], self.person_keys[k])
+            for j, k in self.costars(i)
+        )
+
+    def name_range(self, name):
+        """
+        Return the (start, end) slice of `name_order` whose people have
+        the given lowercase name.
+        """
+        start = self._bisect_name(name, inclusive=False)
+        end = self._bisect_name(name, inclusive=True)
+        return start, end
+
+    def _bisect_name(self, name, inclusive):
+        low, high = 0, len(self.name_order)
+        while low < high:
+            middle = (low + high) // 2
+            other = self.person_names[self.name_order[middle]].lower()
+            if other < name or (inclusive and other == name):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def ids_for_name(self, name):
+        """
+        Return the set of person_ids with the given name, ignoring case.
+        """
+        start, end = self.name_range(name.lower())
+        return set(
+            self.person_keys[self.name_order[n]] for n in range(start, end)
+        )
+
+    def people_view(self):
+        return PeopleView(self)
+
+    def movies_view(self):
+        return MoviesView(self)
+
+    def names_view(self):
+        return NamesView(self)
+
+
+def find_key(keys, order, key):
+    """
+    Binary search for `key` in `keys` visited in sorted `order`.
+    Return its index in `keys`, or None if it is absent.
+    """
+    low, high = 0, len(order)
+    while low < high:
+        middle = (low + high) // 2
+        if keys[order[middle]] < key:
+            low = middle + 1
+        else:
+            high = middle
+    if low < len(order) and keys[order[low]] == key:
+        return order[low]
+    return None
+
+
+class PeopleView(Mapping):
+    """
+    Read-only `people` dictionary backed by a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        i = self.graph.person_index(person_id)
+        if i is None:
+            raise KeyError(person_id)
+        return {
+            "name": self.graph.person_names[i],
+            "birth": self.graph.person_births[i],
+            "movies": set(self.graph.movie_keys[j] for j in self.graph.movies_of(i))
+        }
+
+    def __contains__(self, person_id):
+        return self.graph.person_index(person_id) is not None
+
+    def __iter__(self):
+        return iter(self.graph.person_keys)
+
+    def __len__(self):
+        return self.graph.num_people
+
+
+class MoviesView(Mapping):
+    """
+    Read-only `movies` dictionary backed by a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        j = self.graph.movie_index(movie_id)
+        if j is None:
+            raise KeyError(movie_id)
+        return {
+            "title": self.graph.movie_titles[j],
+            "year": self.graph.movie_years[j],
+            "stars": set(self.graph.person_keys[k] for k in self.graph.stars_of(j))
+        }
+
+    def __contains__(self, movie_id):
+        return self.graph.movie_index(movie_id) is not None
+
+    def __iter__(self):
+        return iter(self.graph.movie_keys)
+
+    def __len__(self):
+        return self.graph.num_movies
+
+
+class NamesView(Mapping):
+    """
+    Read-only `names` dictionary backed by a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        ids = self.graph.ids_for_name(name) if name == name.lower() else None
+        if not ids:
+            raise KeyError(name)
+        return ids
+
+    def __iter__(self):
+        previous = None
+        for i in self.graph.name_order:
+            name = self.graph.person_names[i].lower()
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
@@ -0,0 +1,232 @@
+import json
+import sys
+from array import array
+
+from distances import distance_table
+from util import Node, HashedPriorityFrontier
+
+MAGIC = b"DEGLAND\0"
+VERSION = 2
+
+# Stored in place of a distance when a person cannot reach a landmark
+UNREACHABLE = 255
+
+
+class Landmarks():
+    """
+    Precomputed degrees of separation from K landmark people to
+    everyone, used as an admissible A* heuristic (the ALT method).
+
+    By the triangle inequality, for any landmark L the distance between
+    `v` and `t` is at least |d(L, t) - d(L, v)|. Distances are stored
+    one byte per person per landmark. A connected component label per
+    person lets searches between components stop immediately.
+    """
+
+    def __init__(self, landmarks, distances, component, digest):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.component = component
+        self.digest = digest
+
+    @classmethod
+    def build(cls, g, k=16, method="farthest"):
+        """
+        Choose `k` landmarks in the Graph `g` and run one breadth first
+        search from each. With method "hubs" the people in the most
+        movies are chosen. With "farthest", the first landmark is the
+        biggest hub and each next one is the person farthest from all
+        landmarks chosen so far, which spreads them across the graph.
+        """
+        if method not in ("hubs", "farthest"):
+            raise ValueError(f"unknown method {method!r}")
+        component = components(g)
+        offsets = g.person_offsets
+        by_movies = sorted(range(g.num_people),
+                           key=lambda i: offsets[i + 1] - offsets[i], reverse=True)
+
+        landmarks = []
+        distances = []
+        nearest = None
+        while len(landmarks) < min(k, g.num_people):
+            if method == "hubs" or nearest is None:
+                landmark = by_movies[len(landmarks)]
+            else:
+                # Stay in the first landmark's component, where long
+                # searches happen, and move as far from the others as possible
+                landmark = max(range(g.num_people), key=nearest.__getitem__)
+                if nearest[landmark] <= 0:
+                    break
+            table = distance_table(g, {landmark})
+            column = array("B", (
+                UNREACHABLE if d < 0 else min(d, UNREACHABLE - 1)
+                for d in table.distance
+            ))
+            landmarks.append(landmark)
+            distances.append(column)
+            if method == "farthest":
+                if nearest is None:
+                    nearest = array("i", table.distance)
+                for i, d in enumerate(table.distance):
+                    if d < nearest[i]:
+                        nearest[i] = d
+        return cls(landmarks, distances, component, g.digest())
+
+    def matches(self, g):
+        """
+        Return True if the landmarks were built from a Graph with the
+        same links as `g`. Distances from other links could overestimate
+        and make A* return paths that are not shortest.
+        """
+        return len(self.component) == g.num_people and self.digest == g.digest()
+
+    def bound(self, v, targets):
+        """
+        Return a lower bound on the distance from person `v` to the
+        nearest of `targets`, or None if none of them can be reached.
+        """
+        best = None
+        for t in targets:
+            if self.component[v] != self.component[t]:
+                continue
+            h = 0
+            for column in self.distances:
+                a, b = column[v], column[t]
+                if (a == UNREACHABLE) != (b == UNREACHABLE):
+                    h = None
+                    break
+                if a != UNREACHABLE and abs(a - b) > h:
+                    h = abs(a - b)
+            if h is not None and (best is None or h < best):
+                best = h
+        return best
+
+    def save(self, filename):
+        header = json.dumps({
+            "version": VERSION,
+            "byteorder": sys.byteorder,
+            "landmarks": self.landmarks,
+            "num_people": len(self.component),
+            "digest": self.digest,
+        }).encode("utf-8")
+        with open(filename, "wb") as f:
+            f.write(MAGIC)
+            f.write(header + b"\n")
+            self.component.tofile(f)
+            for column in self.distances:
+                column.tofile(f)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read landmarks written by `save`, or return None if the file is
+        missing or was written by another version or byte order.
+        """
+        try:
+            with open(filename, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return None
+                header = json.loads(f.readline().decode("utf-8"))
+                if header["version"] != VERSION or header["byteorder"] != sys.byteorder:
+                    return None
+                component = array("i")
+                component.fromfile(f, header["num_people"])
+                distances = []
+                for _ in header["landmarks"]:
+                    column = array("B")
+                    column.fromfile(f, header["num_people"])
+                    distances.append(column)
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+        return cls(header["landmarks"], distances, component, header["digest"])
+
+
+def components(g):
+    """
+    Return an array labelling each person in the Graph `g` with the
+    index of the connected component they belong to.
+    """
+    component = array("i", [-1]) * g.num_people
+    seen_movies = set()
+    label = 0
+    for start in range(g.num_people):
+        if component[start] >= 0:
+            continue
+        component[start] = label
+        frontier = [start]
+        while frontier:
+            next_frontier = []
+            for person, movie, stars in g.expand(frontier, seen_movies):
+                for star in stars:
+                    if component[star] < 0:
+                        component[star] = label
+                        next_frontier.append(star)
+            frontier = next_frontier
+        label += 1
+    return component
+
+
+def astar_search(g, landmarks, source_index, target_index, stats=None):
+    """
+    A* search over the Graph `g` between two sets of person indices,
+    guided by the lower bounds from `landmarks`. Returns a list of
+    (movie index, person index) pairs and the number of people expanded.
+    If `stats` is given, its frontier peak is updated as the search runs.
+    """
+    num_states_explored = 0
+    if not source_index or not target_index:
+        return None, num_states_explored
+
+    person_offsets, person_movies = g.person_offsets, g.person_movies
+    movie_offsets, movie_stars = g.movie_offsets, g.movie_stars
+
+    frontier = HashedPriorityFrontier()
+    best = dict()
+    for s in source_index:
+        h = landmarks.bound(s, target_index)
+        if h is None:
+            continue
+        best[s] = 0
+        frontier.add(Node(state=s, parent=None, action=None, cost=(h, 0)))
+
+    # The heuristic is consistent, so the first time a person is removed
+    # from the frontier it has been reached by a shortest path
+    expanded = set()
+
+    # Lowest cost at which each movie's cast has been expanded
+    movie_cost = dict()
+    while not frontier.empty():
+        node = frontier.remove()
+        person = node.state
+        if person in expanded:
+            continue
+        expanded.add(person)
+        cost = best[person]
+        num_states_explored += 1
+        if stats is not None:
+            stats.frontier(len(frontier) + 1)
+
+        if person in target_index:
+            solution = []
+            while node.parent is not None:
+                solution.append((node.action, node.state))
+                node = node.parent
+            solution.reverse()
+            return solution, num_states_explored
+
+        for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+            if movie_cost.get(movie, cost + 1) <= cost:
+                continue
+            movie_cost[movie] = cost
+            for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                if best.get(star, cost + 2) <= cost + 1:
+                    continue
+                h = landmarks.bound(star, target_index)
+                if h is None:
+                    continue
+                best[star] = cost + 1
+                # Order by estimated total, preferring deeper people on ties
+                frontier.add(Node(state=star, parent=node, action=movie,
+                                  cost=(cost + 1 + h, -cost - 1)))
+
+    return None, num_states_explored
@@ -0,0 +1,172 @@
+import csv
+import itertools
+import operator
+import os
+import sys
+from array import array
+
+from graph import Graph
+
+CHUNK_SIZE = 100000
+
+
+def read_chunks(filename, columns, chunk_size=CHUNK_SIZE, progress=None, stage=None):
+    """
+    Yield lists of at most `chunk_size` tuples of the named `columns`
+    from the CSV file `filename`, finding them by the header like
+    csv.DictReader, so that columns may come in any order. Blank rows
+    are skipped, and missing trailing fields read as empty. After each
+    chunk, `progress` is called with the stage name, the rows read so
+    far and the fraction of bytes read.
+    """
+    total = os.path.getsize(filename) or 1
+    consumed = [0]
+
+    with open(filename, "rb") as f:
+        def lines():
+            for line in f:
+                consumed[0] += len(line)
+                yield line.decode("utf-8")
+
+        reader = csv.reader(lines())
+        header = next(reader, [])
+        missing = [name for name in columns if name not in header]
+        if missing:
+            raise ValueError(f"{filename} has no {', '.join(missing)} column")
+        positions = [header.index(name) for name in columns]
+        width = max(positions) + 1
+        pick = operator.itemgetter(*positions)
+
+        def fields(row):
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            return pick(row)
+
+        rows = 0
+        while True:
+            chunk = list(itertools.islice(reader, chunk_size))
+            if not chunk:
+                break
+            rows += len(chunk)
+            chunk = [pick(row) if len(row) >= width else fields(row) for row in chunk if row]
+            yield chunk
+            if progress is not None:
+                progress(stage, rows, consumed[0] / total)
+
+
+def print_progress(stage, rows, fraction):
+    print(f"\r{stage}: {rows} rows ({fraction:.0%})", end="", file=sys.stderr)
+    if fraction >= 1:
+        print(file=sys.stderr)
+
+
+def load_graph(directory, chunk_size=CHUNK_SIZE, progress=None, skip_isolated=False):
+    """
+    Stream people.csv, movies.csv and stars.csv from `directory` into a
+    Graph without building per-row dictionaries.
+
+    Ids are interned as they are read and each star row is kept only as
+    a pair of integers until the CSR arrays are built, so peak memory
+    stays close to the size of the final Graph. If `skip_isolated` is
+    true, people who starred in no movies are left out.
+    """
+    person_lookup = dict()
+    person_keys, person_names, person_births = [], [], []
+    rows = read_chunks(f"{directory}/people.csv", ("id", "name", "birth"),
+                       chunk_size, progress, "people")
+    for chunk in rows:
+        for key, name, birth in chunk:
+            if key in person_lookup:
+                continue
+            person_lookup[key] = len(person_keys)
+            person_keys.append(key)
+            person_names.append(name)
+            person_births.append(birth)
+
+    movie_lookup = dict()
+    movie_keys, movie_titles, movie_years = [], [], []
+    rows = read_chunks(f"{directory}/movies.csv", ("id", "title", "year"),
+                       chunk_size, progress, "movies")
+    for chunk in rows:
+        for key, title, year in chunk:
+            if key in movie_lookup:
+                continue
+            movie_lookup[key] = len(movie_keys)
+            movie_keys.append(key)
+            movie_titles.append(title)
+            movie_years.append(year)
+
+    edge_people = array("i")
+    edge_movies = array("i")
+    rows = read_chunks(f"{directory}/stars.csv", ("person_id", "movie_id"),
+                       chunk_size, progress, "stars")
+    for chunk in rows:
+        for person_id, movie_id in chunk:
+            i = person_lookup.get(person_id)
+            j = movie_lookup.get(movie_id)
+            if i is None or j is None:
+                continue
+            edge_people.append(i)
+            edge_movies.append(j)
+    del person_lookup, movie_lookup
+
+    if skip_isolated:
+        starred = bytearray(len(person_keys))
+        for i in edge_people:
+            starred[i] = 1
+        remap = array("i", [-1]) * len(person_keys)
+        kept = 0
+        for i in range(len(person_keys)):
+            if starred[i]:
+                remap[i] = kept
+                kept += 1
+        person_keys = [k for i, k in enumerate(person_keys) if starred[i]]
+        person_names = [k for i, k in enumerate(person_names) if starred[i]]
+        person_births = [k for i, k in enumerate(person_births) if starred[i]]
+        for e in range(len(edge_people)):
+            edge_people[e] = remap[edge_people[e]]
+        del starred, remap
+
+    person_offsets, person_movies = build_csr(edge_people, edge_movies, len(person_keys))
+    movie_offsets, movie_stars = build_csr(edge_movies, edge_people, len(movie_keys))
+    del edge_people, edge_movies
+
+    return Graph(
+        person_keys, person_names, person_births,
+        movie_keys, movie_titles, movie_years,
+        person_offsets, person_movies, movie_offsets, movie_stars
+    )
+
+
+def build_csr(sources, targets, n):
+    """
+    Counting-sort the edges (sources[e], targets[e]) into CSR offsets
+    and indices, with each row sorted and free of duplicates.
+    """
+    offsets = array("q", [0]) * (n + 1)
+    for s in sources:
+        offsets[s + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+
+    indices = array("i", [0]) * len(sources)
+    fill = array("q", offsets[:n])
+    for s, t in zip(sources, targets):
+        indices[fill[s]] = t
+        fill[s] += 1
+    del fill
+
+    # Sort each row and squeeze out repeated edges in place
+    write = 0
+    start = 0
+    for i in range(n):
+        end = offsets[i + 1]
+        row = sorted(set(indices[start:end])) if end - start > 1 else indices[start:end]
+        offsets[i] = write
+        for t in row:
+            indices[write] = t
+            write += 1
+        start = end
+    offsets[n] = write
+    del indices[write:]
+    return offsets, indices
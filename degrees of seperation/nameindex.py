@@ -0,0 +1,165 @@
+import heapq
+from array import array
+
+
+class NameIndex():
+    """
+    Prefix and typo-tolerant name search over a Graph.
+
+    Prefix search runs directly on the Graph's `name_order`, which lists
+    people sorted by lowercase name. Fuzzy search uses a trigram index
+    over the distinct names, built the first time it is needed.
+    Results are ranked by popularity, the number of movies a person was in.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.trigrams = None
+        self.groups = None
+
+    def popularity(self, i):
+        offsets = self.graph.person_offsets
+        return offsets[i + 1] - offsets[i]
+
+    def name(self, position):
+        return self.graph.person_names[self.graph.name_order[position]].lower()
+
+    def prefix_range(self, prefix):
+        """
+        Return the (start, end) slice of `name_order` whose names
+        start with `prefix`.
+        """
+        prefix = prefix.lower()
+        low, high = 0, len(self.graph.name_order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.name(middle) < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        start = low
+        high = len(self.graph.name_order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.name(middle).startswith(prefix):
+                low = middle + 1
+            else:
+                high = middle
+        return start, low
+
+    def prefix(self, text, limit=10):
+        """
+        Return up to `limit` person indices whose names start with
+        `text`, most popular first.
+        """
+        start, end = self.prefix_range(text)
+        order = self.graph.name_order
+        return heapq.nlargest(
+            limit, (order[n] for n in range(start, end)),
+            key=self.popularity
+        )
+
+    def exact(self, text):
+        """
+        Return the person indices named `text`, most popular first.
+        """
+        start, end = self.graph.name_range(text.lower())
+        order = self.graph.name_order
+        return sorted((order[n] for n in range(start, end)),
+                      key=self.popularity, reverse=True)
+
+    def build_trigrams(self):
+        """
+        Index every distinct lowercase name by its trigrams. Postings
+        hold the position in `name_order` where that name's group starts.
+        """
+        trigrams = dict()
+        groups = array("i")
+        previous = None
+        for position in range(len(self.graph.name_order)):
+            name = self.name(position)
+            if name == previous:
+                continue
+            previous = name
+            group = len(groups)
+            groups.append(position)
+            for gram in set(trigrams_of(name)):
+                postings = trigrams.get(gram)
+                if postings is None:
+                    postings = trigrams[gram] = array("i")
+                postings.append(group)
+        self.trigrams = trigrams
+        self.groups = groups
+
+    def fuzzy(self, text, limit=10, max_distance=2):
+        """
+        Return up to `limit` person indices whose names are within
+        `max_distance` edits of `text`, ranked by edit distance and
+        then popularity.
+        """
+        if self.trigrams is None:
+            self.build_trigrams()
+        text = text.lower()
+        grams = set(trigrams_of(text))
+
+        # Each edit changes at most three trigrams
+        needed = max(1, len(grams) - 3 * max_distance)
+        counts = dict()
+        for gram in grams:
+            for group in self.trigrams.get(gram, ()):
+                counts[group] = counts.get(group, 0) + 1
+
+        scored = []
+        for group, count in counts.items():
+            if count < needed:
+                continue
+            name = self.name(self.groups[group])
+            distance = edit_distance(text, name, max_distance)
+            if distance is None:
+                continue
+            start, end = self.graph.name_range(name)
+            for n in range(start, end):
+                i = self.graph.name_order[n]
+                scored.append((distance, -self.popularity(i), name, i))
+        scored.sort()
+        return [i for _, _, _, i in scored[:limit]]
+
+    def search(self, text, limit=10, max_distance=2):
+        """
+        Return up to `limit` person indices for `text`: exact matches,
+        then prefix matches, then fuzzy matches, without duplicates.
+        """
+        results = []
+        for found in (self.exact(text), self.prefix(text, limit),
+                      self.fuzzy(text, limit, max_distance)):
+            for i in found:
+                if i not in results:
+                    results.append(i)
+        return results[:limit]
+
+
+def trigrams_of(text):
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a, b, limit):
+    """
+    Return the Levenshtein distance between `a` and `b`, or None if it
+    is greater than `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (x != y)
+            ))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
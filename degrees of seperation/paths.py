@@ -0,0 +1,221 @@
+import heapq
+import itertools
+
+
+def layered_search(g, source_index, target_index):
+    """
+    Breadth first search over the Graph `g` from a set of person indices,
+    stopping after the layer in which any target is first reached.
+
+    Returns a dictionary mapping each reached person to their distance
+    from the source, and the distance of the nearest target (or None if
+    no target can be reached).
+    """
+    distance = {s: 0 for s in source_index}
+    if any(t in distance for t in target_index):
+        return distance, 0
+    frontier = list(source_index)
+    seen_movies = set()
+    level = 0
+    while frontier:
+        level += 1
+        found = False
+        next_frontier = []
+        for person, movie, stars in g.expand(frontier, seen_movies):
+            for star in stars:
+                if star in distance:
+                    continue
+                distance[star] = level
+                next_frontier.append(star)
+                if star in target_index:
+                    found = True
+        if found:
+            return distance, level
+        frontier = next_frontier
+    return distance, None
+
+
+def predecessors(g, distance, person):
+    """
+    Yield the (movie, person) pairs one layer closer to the source
+    through which `person` can be reached on a shortest path.
+    """
+    level = distance[person] - 1
+    for movie in g.movies_of(person):
+        for star in g.stars_of(movie):
+            if distance.get(star) == level:
+                yield movie, star
+
+
+def all_shortest_paths(g, source_index, target_index):
+    """
+    Lazily yield every shortest path between the two sets of person
+    indices as a list of (movie, person) pairs.
+
+    One breadth first search builds the layered graph of shortest paths.
+    Paths are then read off it by walking back from the targets, and
+    every branch of that walk reaches a source, so each path costs time
+    proportional to its length.
+    """
+    distance, length = layered_search(g, source_index, target_index)
+    if length is None:
+        return
+    for target in sorted(target_index):
+        if distance.get(target) != length:
+            continue
+        # Depth first walk back to the sources, one generator per level
+        steps = []
+        stack = [iter([(None, target)])]
+        while stack:
+            step = next(stack[-1], None)
+            if step is None:
+                stack.pop()
+                if steps:
+                    steps.pop()
+                continue
+            steps.append(step)
+            movie, person = step
+            if distance[person] == 0:
+                solution = []
+                for i in range(len(steps) - 1, 0, -1):
+                    solution.append((steps[i][0], steps[i - 1][1]))
+                yield solution
+                steps.pop()
+                continue
+            stack.append(predecessors(g, distance, person))
+
+
+def count_shortest_paths(g, source_index, target_index):
+    """
+    Return the number of distinct shortest paths between the two sets
+    of person indices, counted over the layered graph without listing them.
+    """
+    distance, length = layered_search(g, source_index, target_index)
+    if length is None:
+        return 0
+    counts = {s: 1 for s in source_index}
+    layers = [[] for _ in range(length + 1)]
+    for person, d in distance.items():
+        layers[d].append(person)
+    for level in range(1, length + 1):
+        for person in layers[level]:
+            counts[person] = sum(
+                counts.get(previous, 0) for _, previous in predecessors(g, distance, person)
+            )
+    return sum(counts.get(t, 0) for t in target_index if distance.get(t) == length)
+
+
+def restricted_search(g, start, target, blocked_people, blocked_movies, blocked_first, via=None):
+    """
+    Breadth first search from person `start` to `target` that never
+    visits `blocked_people` or `blocked_movies`. Returns (movie, person)
+    pairs or None.
+
+    The first step out of the spur is restricted by removing edges of the
+    person/movie graph, not nodes. If `via` is None, the path leaves
+    `start` by any movie not in `blocked_first`, and those movies stay
+    open to everyone else. Otherwise it leaves through movie `via` to any
+    costar not in `blocked_first`.
+    """
+    def solution(star):
+        steps = []
+        while parents[star] is not None:
+            movie, previous = parents[star]
+            steps.append((movie, star))
+            star = previous
+        steps.reverse()
+        return steps
+
+    parents = {start: None}
+    seen_movies = set(blocked_movies)
+    if via is None:
+        frontier = [start]
+        reopen = set(blocked_first) - seen_movies
+        seen_movies |= reopen
+    else:
+        frontier = []
+        reopen = set()
+        seen_movies.add(via)
+        for star in g.stars_of(via):
+            if star in parents or star in blocked_people or star in blocked_first:
+                continue
+            parents[star] = (via, start)
+            if star == target:
+                return solution(star)
+            frontier.append(star)
+
+    while frontier:
+        next_frontier = []
+        for person, movie, stars in g.expand(frontier, seen_movies):
+            for star in stars:
+                if star in parents or star in blocked_people:
+                    continue
+                parents[star] = (movie, person)
+                if star == target:
+                    return solution(star)
+                next_frontier.append(star)
+        # Movies closed only to the spur open up once it has been expanded
+        seen_movies -= reopen
+        reopen = set()
+        frontier = next_frontier
+    return None
+
+
+def k_shortest_paths(g, source, target):
+    """
+    Lazily yield simple paths (no person or movie repeated) from person
+    index `source` to `target` in order of length, using Yen's algorithm.
+    Callers take as many as they need, e.g. with itertools.islice.
+
+    Yen's algorithm runs on the bipartite person/movie graph, so both the
+    people and the movies of the previous path serve as spur nodes, and
+    only the edges already taken out of a spur are removed.
+    """
+    if source == target:
+        yield []
+        return
+    first = restricted_search(g, source, target, set(), set(), set())
+    if first is None:
+        return
+    found = [first]
+    seen = {tuple(first)}
+    candidates = []
+    counter = itertools.count()
+    yield first
+
+    while True:
+        previous = found[-1]
+        people_on = [source] + [person for _, person in previous]
+        for i in range(len(previous)):
+            spur = people_on[i]
+            root = previous[:i]
+            movie = previous[i][0]
+            sharing = [path for path in found if len(path) > i and path[:i] == root]
+            blocked_people = set(people_on[:i])
+            blocked_movies = set(m for m, _ in root)
+            spur_paths = (
+                # Spur at the person: leave by a movie no found path took
+                restricted_search(
+                    g, spur, target, blocked_people, blocked_movies,
+                    set(path[i][0] for path in sharing)
+                ),
+                # Spur at the movie: leave it for a costar no found path took
+                restricted_search(
+                    g, spur, target, blocked_people, blocked_movies,
+                    set(path[i][1] for path in sharing if path[i][0] == movie), via=movie
+                ),
+            )
+            for spur_path in spur_paths:
+                if spur_path is None:
+                    continue
+                candidate = root + spur_path
+                key = tuple(candidate)
+                if key in seen:
+                    continue
+                seen.add(key)
+                heapq.heappush(candidates, (len(candidate), next(counter), candidate))
+        if not candidates:
+            return
+        _, _, best = heapq.heappop(candidates)
+        found.append(best)
+        yield best
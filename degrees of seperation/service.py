@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import degrees
+from batch import init_worker
+
+# Number of recent request latencies kept for percentiles
+LATENCY_WINDOW = 10000
+
+# Number of threads resolving names off the event loop
+LOOKUP_THREADS = 4
+
+
+class BadRequest(Exception):
+    """
+    Raised for a request the service cannot parse.
+    """
+
+
+class LRUCache():
+    """
+    Bounded mapping that evicts the least recently used entry.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def reverse_path(source_id, solution):
+    """
+    Turn a (movie_id, person_id) path from `source_id` into the
+    same path walked from its other end.
+    """
+    persons = [source_id] + [person for _, person in solution]
+    reversed_solution = []
+    for i in range(len(solution) - 1, -1, -1):
+        reversed_solution.append((solution[i][0], persons[i]))
+    return reversed_solution
+
+
+def resolve(query):
+    """
+    Return the person_id for a person_id or name, picking the most
+    popular person when a name is shared.
+    """
+    if query in degrees.people:
+        return query
+    return degrees.person_id_for_name(query, policy="popular")
+
+
+def worker_path(source_id, target_id, strategy):
+    return degrees.shortest_path(source_id, target_id, strategy=strategy)
+
+
+class DegreesService():
+    """
+    Answers separation queries over HTTP. The graph is loaded once, searches
+    run in a pool of worker processes, and results are cached by the
+    unordered pair of people so that a query and its reverse share an entry.
+    Name resolution and autocomplete run in the `lookups` thread pool (the
+    event loop's default one if None), so they never hold up other requests.
+    """
+
+    def __init__(self, executor, cache_size=10000, strategy="bidirectional", lookups=None):
+        self.executor = executor
+        self.lookups = lookups
+        self.cache = LRUCache(cache_size)
+        self.strategy = strategy
+        self.pending = dict()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+
+    async def shortest_path(self, source_id, target_id):
+        """
+        Return the path from `source_id` to `target_id` and whether it
+        came from the cache. Concurrent requests for the same pair share
+        one search.
+        """
+        key = (min(source_id, target_id), max(source_id, target_id))
+        # Entries are 1-tuples so that unconnected pairs can be cached too
+        entry = self.cache.get(key)
+        cache_hit = entry is not None
+        if not cache_hit:
+            future = self.pending.get(key)
+            if future is None:
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(
+                    self.executor, worker_path, key[0], key[1], self.strategy
+                )
+                self.pending[key] = future
+                future.add_done_callback(lambda _: self.pending.pop(key, None))
+            entry = (await future,)
+            self.cache.put(key, entry)
+
+        solution = entry[0]
+        if solution is None:
+            return None, cache_hit
+        if source_id != key[0]:
+            solution = reverse_path(key[0], solution)
+        return solution, cache_hit
+
+    async def handle_path(self, query):
+        names = [query.get("source", [""])[0], query.get("target", [""])[0]]
+        loop = asyncio.get_running_loop()
+        ids = await asyncio.gather(*(
+            loop.run_in_executor(self.lookups, resolve, name) for name in names
+        ))
+        if None in ids:
+            return 404, {"error": "Person not found."}
+        solution, cache_hit = await self.shortest_path(*ids)
+        result = {"source": ids[0], "target": ids[1], "cached": cache_hit}
+        if solution is None:
+            result.update({"degrees": None, "path": None})
+        else:
+            result["degrees"] = len(solution)
+            result["path"] = [
+                {"movie_id": movie_id, "title": degrees.movies[movie_id]["title"],
+                 "person_id": person_id, "name": degrees.people[person_id]["name"]}
+                for movie_id, person_id in solution
+            ]
+        return 200, result
+
+    async def handle_names(self, query):
+        text = query.get("q", [""])[0]
+        try:
+            limit = int(query.get("limit", ["10"])[0])
+        except ValueError:
+            raise BadRequest("limit must be an integer.")
+        loop = asyncio.get_running_loop()
+        found = await loop.run_in_executor(self.lookups, degrees.search_names, text, limit)
+        return 200, [
+            {"person_id": person_id, "name": degrees.people[person_id]["name"],
+             "birth": degrees.people[person_id]["birth"]}
+            for person_id in found
+        ]
+
+    def handle_stats(self):
+        ordered = sorted(self.latencies)
+
+        def percentile(p):
+            if not ordered:
+                return None
+            return 1000 * ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+        return 200, {
+            "requests": self.requests,
+            "errors": self.errors,
+            "p50_ms": percentile(50),
+            "p99_ms": percentile(99),
+            "cache_size": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+        }
+
+    async def route(self, target):
+        try:
+            url = urlsplit(target)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        query = parse_qs(url.query)
+        if url.path == "/path":
+            return await self.handle_path(query)
+        if url.path == "/names":
+            return await self.handle_names(query)
+        if url.path == "/stats":
+            return self.handle_stats()
+        return 404, {"error": "Not found."}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            start = time.perf_counter()
+            try:
+                parts = request_line.decode("latin-1").split(" ", 2)
+                if len(parts) != 3:
+                    raise BadRequest("Malformed request line.")
+                method, target, _ = parts
+                if method != "GET":
+                    status, body = 405, {"error": "Only GET is supported."}
+                else:
+                    status, body = await self.route(target)
+            except BadRequest as e:
+                status, body = 400, {"error": str(e)}
+            except Exception:
+                status, body = 500, {"error": "Internal server error."}
+            self.requests += 1
+            if status >= 400:
+                self.errors += 1
+            elif not target.startswith("/stats"):
+                self.latencies.append(time.perf_counter() - start)
+
+            payload = json.dumps(body).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+async def serve(service, host="127.0.0.1", port=8765, socket_path=None):
+    """
+    Serve `service` on a local TCP port or, if `socket_path` is given,
+    on a Unix domain socket, until cancelled.
+    """
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(service.handle_connection, path=socket_path)
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def run_service(directory, host="127.0.0.1", port=8765, socket_path=None,
+                processes=None, cache_size=10000, strategy="bidirectional",
+                use_snapshot=True, skip_isolated=False):
+    """
+    Load the data in `directory` and serve separation lookups until
+    interrupted. The name index, trigrams included, is built before the
+    first request.
+    """
+    degrees.load_data(directory, use_snapshot=use_snapshot, skip_isolated=skip_isolated)
+    degrees.current_graph()
+    degrees.current_name_index().build_trigrams()
+    with ProcessPoolExecutor(processes, initializer=init_worker,
+                             initargs=(directory, use_snapshot, skip_isolated)) as executor, \
+            ThreadPoolExecutor(LOOKUP_THREADS) as lookups:
+        service = DegreesService(executor, cache_size, strategy, lookups)
+        try:
+            asyncio.run(serve(service, host, port, socket_path))
+        except KeyboardInterrupt:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve degrees of separation lookups.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--cache-size", type=int, default=10000)
+    args = parser.parse_args()
+    run_service(args.directory, args.host, args.port, args.socket,
+                args.processes, args.cache_size)
+
+
+if __name__ == "__main__":
+    main()
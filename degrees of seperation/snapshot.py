@@ -0,0 +1,265 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+from array import array
+
+from graph import Graph
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 1
+SNAPSHOT_NAME = "degrees.snapshot"
+CSV_FILES = ("people.csv", "movies.csv", "stars.csv")
+
+# Graph columns holding integers, and the array typecode each is stored as
+INT_COLUMNS = {
+    "person_offsets": "q",
+    "person_movies": "i",
+    "movie_offsets": "q",
+    "movie_stars": "i",
+    "name_order": "i",
+    "person_key_order": "i",
+    "movie_key_order": "i",
+}
+
+# Sort orders computed from a key column when the Graph has none yet
+KEY_COLUMNS = {
+    "person_key_order": "person_keys",
+    "movie_key_order": "movie_keys",
+}
+
+# Graph columns holding strings
+STRING_COLUMNS = (
+    "person_keys", "person_names", "person_births",
+    "movie_keys", "movie_titles", "movie_years",
+)
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as one UTF-8 blob plus an
+    offsets array, decoded on access.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def fingerprint(directory, with_hash=False):
+    """
+    Return a dictionary describing the size and modification time of
+    each CSV file in `directory`, and optionally a hash of its contents.
+    """
+    result = {}
+    for name in CSV_FILES:
+        filename = os.path.join(directory, name)
+        stat = os.stat(filename)
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        if with_hash:
+            entry["sha256"] = file_hash(filename)
+        result[name] = entry
+    return result
+
+
+def file_hash(filename):
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def current_fingerprint(directory, stored):
+    """
+    Return the fingerprint of the CSV files in `directory` if they still
+    match the stored one, or None if they do not. Files whose size or
+    mtime changed are compared by hash, so a touched but otherwise
+    identical file does not force a rebuild; the returned fingerprint
+    holds its new mtime, so that it need not be hashed again next time.
+    """
+    try:
+        current = fingerprint(directory)
+    except OSError:
+        return None
+    for name in CSV_FILES:
+        old, new = stored.get(name), current[name]
+        if old is None or old["size"] != new["size"]:
+            return None
+        if old["mtime"] != new["mtime"]:
+            if old.get("sha256") != file_hash(os.path.join(directory, name)):
+                return None
+        new["sha256"] = old.get("sha256")
+    return current
+
+
+def is_current(directory, stored):
+    """
+    Return True if the CSV files in `directory` still match the stored
+    fingerprint.
+    """
+    return current_fingerprint(directory, stored) is not None
+
+
+def rewrite_fingerprint(filename, header, length, stored_fingerprint):
+    """
+    Store a new fingerprint in the header of the snapshot at `filename`,
+    copying its sections unchanged, and return the new header length.
+    If the file cannot be rewritten it is left as it was.
+    """
+    header = dict(header, fingerprint=stored_fingerprint)
+    encoded = json.dumps(header).encode("utf-8")
+    temporary = filename + ".tmp"
+    try:
+        with open(filename, "rb") as source, open(temporary, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<II", VERSION, len(encoded)))
+            f.write(encoded)
+            f.write(bytes(align(len(MAGIC) + 8 + len(encoded)) - f.tell()))
+            source.seek(align(len(MAGIC) + 8 + length))
+            shutil.copyfileobj(source, f, 1 << 20)
+        os.replace(temporary, filename)
+    except OSError:
+        return length
+    return len(encoded)
+
+
+def save_snapshot(graph, filename, stored_fingerprint, options=None):
+    """
+    Write `graph` to `filename` as a versioned binary snapshot.
+    `options` records how the graph was loaded, so a snapshot built with
+    different options is not reused. The file is written to a temporary
+    name and moved into place.
+    """
+    sections = []
+    for name, typecode in INT_COLUMNS.items():
+        column = getattr(graph, name)
+        if column is None:
+            column = key_order(getattr(graph, KEY_COLUMNS[name]))
+        sections.append((name, typecode, array(typecode, column)))
+    for name in STRING_COLUMNS:
+        encoded = [value.encode("utf-8") for value in getattr(graph, name)]
+        offsets = array("q", [0])
+        total = 0
+        for value in encoded:
+            total += len(value)
+            offsets.append(total)
+        sections.append((name + ".offsets", "q", offsets))
+        sections.append((name + ".blob", "B", array("B", b"".join(encoded))))
+
+    table = {}
+    position = 0
+    for name, typecode, data in sections:
+        table[name] = [position, typecode, len(data)]
+        position = align(position + len(data) * data.itemsize)
+    header = json.dumps({
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "fingerprint": stored_fingerprint,
+        "options": options or {},
+        "sections": table,
+    }).encode("utf-8")
+    start = align(len(MAGIC) + 8 + len(header))
+
+    temporary = filename + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<II", VERSION, len(header)))
+        f.write(header)
+        for name, typecode, data in sections:
+            f.seek(start + table[name][0])
+            f.write(memoryview(data).cast("B"))
+        f.truncate(start + position)
+    os.replace(temporary, filename)
+
+
+def load_snapshot(filename, directory=None, options=None):
+    """
+    Memory-map the snapshot at `filename` and return a Graph whose
+    columns read straight from the mapped pages.
+
+    Returns None if the file is missing, from another version or byte
+    order, built with other `options`, or (when `directory` is given)
+    stale with respect to its CSVs. If the CSVs were only touched, the
+    snapshot's fingerprint is updated so later loads skip hashing them.
+    """
+    mapped = None
+    try:
+        with open(filename, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            version, length = struct.unpack("<II", f.read(8))
+            if version != VERSION:
+                return None
+            header = json.loads(f.read(length).decode("utf-8"))
+            if header["byteorder"] != sys.byteorder:
+                return None
+            if options is not None and header["options"] != options:
+                return None
+            current = header["fingerprint"]
+            if directory is not None:
+                current = current_fingerprint(directory, current)
+                if current is None:
+                    return None
+            if current == header["fingerprint"]:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped is None:
+            length = rewrite_fingerprint(filename, header, length, current)
+            with open(filename, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+    start = align(len(MAGIC) + 8 + length)
+    view = memoryview(mapped)
+    columns = {}
+    for name, (offset, typecode, count) in header["sections"].items():
+        size = array(typecode).itemsize
+        begin = start + offset
+        columns[name] = view[begin:begin + count * size].cast(typecode)
+
+    strings = {
+        name: StringTable(columns[name + ".blob"], columns[name + ".offsets"])
+        for name in STRING_COLUMNS
+    }
+    return Graph(
+        strings["person_keys"], strings["person_names"], strings["person_births"],
+        strings["movie_keys"], strings["movie_titles"], strings["movie_years"],
+        columns["person_offsets"], columns["person_movies"],
+        columns["movie_offsets"], columns["movie_stars"],
+        name_order=columns["name_order"],
+        person_key_order=columns["person_key_order"],
+        movie_key_order=columns["movie_key_order"]
+    )
+
+
+def key_order(keys):
+    """
+    Return the indices of `keys` sorted by key, for binary search.
+    """
+    return sorted(range(len(keys)), key=keys.__getitem__)
+
+
+def align(position):
+    return (position + 7) & ~7
@@ -1,8 +1,16 @@
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
 class Node():
-    def __init__(self, state, parent, action):
+    def __init__(self, state, parent, action, cost=0):
         self.state = state
         self.parent = parent
         self.action = action
+        self.cost = cost
 
 
 class StackFrontier():
@@ -36,3 +44,101 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class HashedStackFrontier():
+    """
+    Stack frontier backed by a deque plus a set of the states it holds,
+    so add, remove and contains_state all run in constant time.
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = set()
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states.add(node.state)
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def __len__(self):
+        return len(self.frontier)
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.pop()
+        self.states.discard(node.state)
+        return node
+
+
+class HashedQueueFrontier(HashedStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = self.frontier.popleft()
+        self.states.discard(node.state)
+        return node
+
+
+class HashedPriorityFrontier(HashedStackFrontier):
+    """
+    Frontier that always removes the node with the lowest `cost`.
+    Ties are broken in insertion order.
+    """
+
+    def __init__(self):
+        self.frontier = []
+        self.states = set()
+        self.counter = itertools.count()
+
+    def add(self, node):
+        heapq.heappush(self.frontier, (node.cost, next(self.counter), node))
+        self.states.add(node.state)
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        node = heapq.heappop(self.frontier)[2]
+        self.states.discard(node.state)
+        return node
+
+
+class SearchStats():
+    """
+    Measurements from one search: people expanded, the largest the
+    frontier grew, seconds spent in each phase and, if traced, the
+    peak memory allocated in bytes.
+    """
+
+    def __init__(self):
+        self.nodes_expanded = 0
+        self.frontier_peak = 0
+        self.phases = dict()
+        self.memory_peak = None
+
+    def frontier(self, size):
+        if size > self.frontier_peak:
+            self.frontier_peak = size
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.perf_counter() - start
+
+    def as_dict(self):
+        return {
+            "nodes_expanded": self.nodes_expanded,
+            "frontier_peak": self.frontier_peak,
+            "phases": dict(self.phases),
+            "memory_peak": self.memory_peak,
+        }
@@ -0,0 +1,207 @@
+import itertools
+
+# Values a gene variable can take
+GENES = (0, 1, 2)
+
+
+class Factor():
+    """
+    A function from assignments of some gene variables to numbers.
+
+    `values` lists the value for every assignment of `variables`, with
+    the last variable changing fastest, so a factor over k variables
+    holds 3 ** k numbers.
+    """
+
+    def __init__(self, variables, values):
+        self.variables = tuple(variables)
+        self.values = values
+
+    def positions(self, variables):
+        """
+        Return, for every assignment of `variables` (a superset of this
+        factor's variables) in order, the position of the matching value
+        in `self.values`.
+        """
+        strides = {
+            v: len(GENES) ** (len(self.variables) - i - 1)
+            for i, v in enumerate(self.variables)
+        }
+        positions = [0]
+        for v in variables:
+            stride = strides.get(v, 0)
+            positions = [p + g * stride for p in positions for g in GENES]
+        return positions
+
+    def multiply(self, other):
+        """
+        Return the product of this factor and `other`, over the union of
+        their variables.
+        """
+        variables = self.variables + tuple(v for v in other.variables if v not in self.variables)
+        mine, theirs = self.values, other.values
+        return Factor(variables, [
+            mine[i] * theirs[j]
+            for i, j in zip(self.positions(variables), other.positions(variables))
+        ])
+
+    def marginalize(self, variables):
+        """
+        Return this factor summed over every variable not in `variables`.
+        """
+        variables = tuple(variables)
+        target = Factor(variables, None).positions(self.variables)
+        values = [0.0] * len(GENES) ** len(variables)
+        for t, x in zip(target, self.values):
+            values[t] += x
+        return Factor(variables, values)
+
+    def normalized(self):
+        total = sum(self.values)
+        return Factor(self.variables, [x / total for x in self.values])
+
+
+def product(factors, variables=()):
+    """
+    Return the product of `factors`, over at least `variables`.
+    """
+    result = Factor(variables, [1.0] * len(GENES) ** len(variables))
+    for f in factors:
+        result = result.multiply(f)
+    return result
+
+
+def pass_probability(genes, probs):
+    """
+    Return the probability that a parent with `genes` copies of the gene
+    passes one on to a child, allowing for mutation.
+    """
+    if genes == 2:
+        return 1 - probs["mutation"]
+    if genes == 1:
+        return 0.5
+    return probs["mutation"]
+
+
+def inheritance_table(probs):
+    """
+    Return a nested list where `[gm][gf][g]` is the probability that a
+    child of parents with `gm` and `gf` copies of the gene has `g`.
+    """
+    table = [[None] * len(GENES) for _ in GENES]
+    for gm, gf in itertools.product(GENES, GENES):
+        pm, pf = pass_probability(gm, probs), pass_probability(gf, probs)
+        table[gm][gf] = [(1 - pm) * (1 - pf), pm * (1 - pf) + pf * (1 - pm), pm * pf]
+    return table
+
+
+def network_factors(people, probs):
+    """
+    Return the factors of the family's Bayesian network over gene
+    variables: each person's gene distribution (unconditional for people
+    without parents, inherited otherwise) times the probability of their
+    trait, if it is known.
+    """
+    inheritance = inheritance_table(probs)
+    factors = []
+    for person, data in people.items():
+        trait = data["trait"]
+        evidence = [
+            probs["trait"][g][trait] if trait is not None else 1
+            for g in GENES
+        ]
+        mother, father = data["mother"], data["father"]
+        if mother is None and father is None:
+            factors.append(Factor((person,), [probs["gene"][g] * evidence[g] for g in GENES]))
+            continue
+
+        values = []
+        for gm, gf in itertools.product(GENES, GENES):
+            values.extend(inheritance[gm][gf][g] * evidence[g] for g in GENES)
+        factors.append(Factor((mother, father, person), values))
+    return factors
+
+
+def elimination_order(factors):
+    """
+    Return an order in which to eliminate every variable, greedily
+    choosing the variable whose elimination creates the smallest factor.
+    On a pedigree this works in from the leaves.
+    """
+    scopes = [set(f.variables) for f in factors]
+    remaining = set().union(*scopes)
+    order = []
+    while remaining:
+        def joined(variable):
+            return set().union(*(s for s in scopes if variable in s))
+        variable = min(remaining, key=lambda v: (len(joined(v)), v))
+        scope = joined(variable)
+        scopes = [s for s in scopes if variable not in s] + [scope - {variable}]
+        remaining.remove(variable)
+        order.append(variable)
+    return order
+
+
+def gene_marginals(factors):
+    """
+    Return a dictionary mapping each gene variable to its distribution
+    given the evidence folded into `factors`.
+
+    Variables are eliminated once, in `elimination_order`. Each
+    elimination multiplies the factors that mention the variable, sums
+    it out, and sends the result on to the next variable it mentions, so
+    the eliminations form a tree. A second pass back down that tree
+    sends each variable what the rest of the network says about it, so
+    every marginal comes out of the two passes instead of one full
+    elimination per person.
+    """
+    order = elimination_order(factors)
+    rank = {v: i for i, v in enumerate(order)}
+
+    # Original factors, and messages from earlier eliminations, per variable
+    bucket = {v: [] for v in order}
+    for f in factors:
+        bucket[min(f.variables, key=rank.__getitem__)].append(f)
+    children = {v: [] for v in order}
+    up = dict()
+    for v in order:
+        pieces = bucket[v] + [up[c] for c in children[v]]
+        scope = set().union(*(f.variables for f in pieces)) - {v}
+        up[v] = product(pieces).marginalize(sorted(scope, key=rank.__getitem__)).normalized()
+        if scope:
+            children[min(scope, key=rank.__getitem__)].append(v)
+
+    down = dict()
+    marginals = dict()
+    for v in reversed(order):
+        pieces = bucket[v] + [down[v]] if v in down else list(bucket[v])
+        marginals[v] = product(pieces + [up[c] for c in children[v]]).marginalize((v,)).normalized()
+        for c in children[v]:
+            others = pieces + [up[o] for o in children[v] if o != c]
+            down[c] = product(others, up[c].variables).marginalize(up[c].variables).normalized()
+    return {v: dict(zip(GENES, marginals[v].values)) for v in order}
+
+
+def marginals(people, probs):
+    """
+    Return, for every person in `people`, the probability of each gene
+    count and of having the trait given the known traits, in the same
+    form as the brute-force enumeration in heredity.py.
+
+    A known trait is certain; an unknown one follows from the person's
+    gene distribution.
+    """
+    genes = gene_marginals(network_factors(people, probs))
+    probabilities = dict()
+    for person, data in people.items():
+        gene = genes[person]
+        if data["trait"] is not None:
+            trait = {True: float(data["trait"]), False: float(not data["trait"])}
+        else:
+            has_trait = sum(gene[g] * probs["trait"][g][True] for g in GENES)
+            trait = {True: has_trait, False: 1 - has_trait}
+        probabilities[person] = {
+            "gene": {2: gene[2], 1: gene[1], 0: gene[0]},
+            "trait": trait,
+        }
+    return probabilities
@@ -1,6 +1,8 @@
+import argparse
 import csv
 import itertools
-import sys
+
+import elimination
 
 PROBS = {
 
@@ -40,10 +42,35 @@ PROBS = {
 def main():
 
     # Check for proper usage
-    data_root = './data/family2j.csv'
-    people = load_data(data_root)
+    parser = argparse.ArgumentParser(description="Infer gene and trait probabilities in a family.")
+    parser.add_argument("data", nargs="?", default="data/family2.csv")
+    parser.add_argument("--enumerate", action="store_true",
+                        help="sum over every assignment instead of using variable elimination")
+    args = parser.parse_args()
+    people = load_data(args.data)
 
     # Keep track of gene and trait probabilities for each person
+    if args.enumerate:
+        probabilities = enumerate_probabilities(people)
+    else:
+        probabilities = elimination.marginals(people, PROBS)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Return gene and trait probabilities for each person by summing the
+    joint probability of every assignment of genes and traits that is
+    consistent with the known traits.
+    """
     probabilities = {
         person: {
             "gene": {
@@ -59,38 +86,30 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
+    # Known traits are fixed, so only people with unknown traits vary
     names = set(people)
-    for have_trait in powerset(names):
+    known = {person for person in names if people[person]["trait"]}
+    unknown = {person for person in names if people[person]["trait"] is None}
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
+    # Compile the family once for every joint probability
+    pedigree = Pedigree(people)
+
+    # Loop over all sets of people who might have the gene
+    for one_gene in powerset(names):
+        for two_genes in powerset(names - one_gene):
+            genes = pedigree.genes(one_gene, two_genes)
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
+            # Loop over all sets of people consistent with known traits
+            for may_have_trait in powerset(unknown):
+                have_trait = known | may_have_trait
 
                 # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
+                p = pedigree.probability(genes, pedigree.traits(have_trait))
                 update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
@@ -117,31 +136,77 @@ def load_data(filename):
 
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Yield every possible subset of set s, one at a time, so that the
+    subsets are never all held in memory at once.
     """
     s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
-
-def create_jp_index(People, One_gene, Two_genes, Have_trait):
-    jp_index = dict()
-    for peep in People.keys(): 
-        jp_index[peep] = dict()
-        if peep in One_gene:
-            jp_index[peep]['Gene'] = 1
-        elif peep in Two_genes: 
-            jp_index[peep]['Gene'] = 2
-        else: 
-            jp_index[peep]['Gene'] = 0
-        if peep in Have_trait: 
-            jp_index[peep]['Trait'] = True 
-        else: 
-            jp_index[peep]['Trait'] = False 
-
-    return jp_index
+    for r in range(len(s) + 1):
+        for subset in itertools.combinations(s, r):
+            yield set(subset)
+
+class Pedigree():
+    """
+    A family compiled once for evaluating joint probabilities.
+
+    People are listed parents first, each with the positions of their
+    parents in that list (None for people without parents), and the
+    gene, inheritance and trait probabilities are held in nested lists
+    indexed by gene count and trait. An assignment is then a list of
+    gene counts and a list of traits in the same order as `names`.
+    """
+
+    def __init__(self, people, probs=PROBS):
+        names = []
+        index = dict()
+        remaining = list(people)
+        while remaining:
+            ready = [
+                person for person in remaining
+                if all(parent is None or parent in index
+                       for parent in (people[person]["mother"], people[person]["father"]))
+            ]
+            if not ready:
+                raise ValueError("every parent must be in the family and not their own ancestor")
+            for person in ready:
+                index[person] = len(names)
+                names.append(person)
+            remaining = [person for person in remaining if person not in index]
+
+        self.names = names
+        self.parents = [
+            None if people[person]["mother"] is None and people[person]["father"] is None
+            else (index[people[person]["mother"]], index[people[person]["father"]])
+            for person in names
+        ]
+        self.gene = [probs["gene"][g] for g in elimination.GENES]
+        self.inheritance = elimination.inheritance_table(probs)
+        self.trait = [
+            [probs["trait"][g][False], probs["trait"][g][True]]
+            for g in elimination.GENES
+        ]
+
+    def genes(self, one_gene, two_genes):
+        return [
+            1 if person in one_gene else 2 if person in two_genes else 0
+            for person in self.names
+        ]
+
+    def traits(self, have_trait):
+        return [person in have_trait for person in self.names]
+
+    def probability(self, genes, traits):
+        """
+        Return the joint probability of the gene counts `genes` and the
+        traits `traits`.
+        """
+        gene, inheritance, trait = self.gene, self.inheritance, self.trait
+        p = 1
+        for parents, g, t in zip(self.parents, genes, traits):
+            if parents is None:
+                p *= gene[g] * trait[g][t]
+            else:
+                p *= inheritance[genes[parents[0]]][genes[parents[1]]][g] * trait[g][t]
+        return p
 
 
 def joint_probability(people, one_gene, two_genes, have_trait):
@@ -154,47 +219,12 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone not in `one_gene` or `two_gene` does not have the gene, and
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
+
+    To evaluate many assignments of the same family, compile it once
+    with Pedigree instead.
     """
-    jp_index = create_jp_index(people, one_gene, two_genes, have_trait)
-
-    PROBS['inheritance'] = {
-    0: PROBS['mutation'] ,
-    1: (0.5*PROBS['mutation']) + (0.5*(1 - PROBS['mutation'])),
-    2: 1 - PROBS['mutation']
-    } 
-    
-    joint_probabilities = 1
-    searched = set()
-    people2 = people.copy()
-    while bool(people2) == True:
-        for peep in people2.keys(): 
-            current_gene = jp_index[peep]['Gene']
-            current_trait = jp_index[peep]['Trait']
-            # if no parents 
-            if people[peep]['mother'] == None and people[peep]['father'] == None: 
-                P_gene = PROBS['gene'][current_gene]
-                P_trait = PROBS["trait"][current_gene][current_trait]
-                joint_probabilities *= (P_gene*P_trait)
-                searched.add(peep)
-            elif (people[peep]['mother'] in searched  and people[peep]['father'] in searched) == True:
-                mother = people[peep]['mother']
-                father = people[peep]['father']
-                if jp_index[peep]['Gene'] == 1:
-                    M_only = PROBS['inheritance'][jp_index[mother]['Gene']]*PROBS['inheritance'][2 -  jp_index[father]['Gene']]
-                    F_only = PROBS['inheritance'][jp_index[father]['Gene']]*PROBS['inheritance'][2 -  jp_index[mother]['Gene']]
-                    P_gene = M_only + F_only 
-                if jp_index[peep]['Gene'] == 0:
-                    P_gene = PROBS['inheritance'][2 -  jp_index[father]['Gene']] *PROBS['inheritance'][2 -  jp_index[mother]['Gene']]  
-                if jp_index[peep]['Gene'] == 2:
-                    P_gene = PROBS['inheritance'][jp_index[mother]['Gene']]*PROBS['inheritance'][jp_index[father]['Gene']]
-                P_trait = PROBS["trait"][current_gene][current_trait]
-                joint_probabilities *= (P_gene*P_trait)
-                searched.add(peep)
-
-        for peep in searched: 
-            people2.pop(peep, None)
-
-    return joint_probabilities
+    pedigree = Pedigree(people)
+    return pedigree.probability(pedigree.genes(one_gene, two_genes), pedigree.traits(have_trait))
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -204,12 +234,10 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
     Which value for each distribution is updated depends on whether
     the person is in `have_gene` and `have_trait`, respectively.
     """
-    jp_index = create_jp_index(probabilities, one_gene, two_genes, have_trait)  
     for peep in probabilities:
-        gene_index = jp_index[peep]['Gene']
-        trait_index = jp_index[peep]['Trait']
-        probabilities[peep]['gene'][gene_index] += p 
-        probabilities[peep]['trait'][trait_index] += p 
+        gene = 1 if peep in one_gene else 2 if peep in two_genes else 0
+        probabilities[peep]['gene'][gene] += p
+        probabilities[peep]['trait'][peep in have_trait] += p
 
 
 def normalize(probabilities):
@@ -0,0 +1,233 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import pagerank
+from convergence import METHODS, SolveStats, solve
+from linkgraph import LinkGraph
+from montecarlo import SampleStats, monte_carlo_ranks
+
+# Largest corpus the original dict engines are run on, as they are
+# quadratic (iteration) or slow per sample (sampling) in corpus size
+LEGACY_LIMIT = 500
+
+
+def synthetic_graph(pages, mean_links=8, dangling=0.1, components=3, seed=0):
+    """
+    Return a random web-like LinkGraph with `pages` pages.
+
+    Out-degrees follow a power law with about `mean_links` links per
+    page, and a `dangling` fraction of pages have none. Pages are split
+    into `components` groups that never link to each other, and within a
+    group links favour its first pages, so in-degrees are skewed too.
+    There are no self links or repeated links.
+    """
+    rng = np.random.default_rng(seed)
+    out_degree = np.minimum(rng.zipf(2.0, size=pages), 1000)
+    out_degree = np.maximum(1, np.round(out_degree * mean_links / out_degree.mean()))
+    out_degree[rng.random(pages) < dangling] = 0
+    out_degree = out_degree.astype(np.int64)
+
+    sources = np.repeat(np.arange(pages, dtype=np.int64), out_degree)
+    group = sources * components // pages
+    group_start = (group * pages + components - 1) // components
+    group_end = ((group + 1) * pages + components - 1) // components
+    local = np.floor((group_end - group_start) * rng.random(len(sources)) ** 3).astype(np.int64)
+    targets = group_start + local
+
+    keep = sources != targets
+    keys = np.unique(sources[keep] * pages + targets[keep])
+    sources, targets = keys // pages, keys % pages
+    offsets = np.zeros(pages + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=pages), out=offsets[1:])
+    width = len(str(pages - 1))
+    names = [f"{i:0{width}}.html" for i in range(pages)]
+    return LinkGraph(names, offsets, targets.astype(np.int32))
+
+
+def write_corpus(graph, directory):
+    """
+    Write one HTML file per page of `graph` into `directory`, linking to
+    the pages it links to, so that crawling can be measured too.
+    """
+    for i, name in enumerate(graph.names):
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n<head><title>{name}</title></head>\n<body>\n")
+            for j in graph.links(i):
+                f.write(f'<p>See <a href="{graph.names[j]}">{graph.names[j]}</a>.</p>\n')
+            f.write("</body>\n</html>\n")
+
+
+def engines(samples, seed):
+    """
+    Return a dictionary mapping engine names to functions that take a
+    LinkGraph and its corpus dictionary and return an array of ranks in
+    graph order, plus the iterations or samples they used.
+    """
+    def matrix(method):
+        def run(graph, corpus):
+            stats = SolveStats()
+            ranks = solve(graph, pagerank.DAMPING, method, stats=stats)
+            return ranks, stats.iterations, None
+        return run
+
+    def iterate_dict(graph, corpus):
+        ranks = pagerank.iterate_pagerank(corpus, pagerank.DAMPING, engine="dict")
+        return np.array([ranks[name] for name in graph.names]), None, None
+
+    def sample_dict(graph, corpus):
+        ranks = pagerank.sample_pagerank(corpus, pagerank.DAMPING, pagerank.SAMPLES, engine="dict")
+        return np.array([ranks[name] for name in graph.names]), None, pagerank.SAMPLES
+
+    def iterate_default(graph, corpus):
+        stats = SolveStats()
+        ranks = pagerank.matrix_pagerank(graph, pagerank.DAMPING, stats=stats)
+        return ranks, stats.iterations, None
+
+    def sample_vector(graph, corpus):
+        ranks = pagerank.sample_ranks(graph, pagerank.DAMPING, samples, seed)
+        return ranks, None, samples
+
+    def monte_carlo(graph, corpus):
+        stats = SampleStats()
+        ranks, _ = monte_carlo_ranks(graph, pagerank.DAMPING, seed=seed, stats=stats)
+        return ranks, None, stats.samples
+
+    runs = {
+        "iterate-dict": iterate_dict,
+        "sample-dict": sample_dict,
+        "iterate-matrix": iterate_default,
+    }
+    for method in METHODS:
+        runs[f"solve-{method}"] = matrix(method)
+    runs["sample-vector"] = sample_vector
+    runs["monte-carlo"] = monte_carlo
+    return runs
+
+
+def measure(function, trace_memory=False):
+    """
+    Call `function` and return its result, the seconds it took and, if
+    `trace_memory` is set, the peak memory it allocated in bytes.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run(name, graph, runs, trace_memory=False):
+    """
+    Run every engine in `runs` on `graph` and return one summary row per
+    engine, with its error against a tightly converged reference.
+    """
+    reference = solve(graph, pagerank.DAMPING, "power", tolerance=1e-12, max_iterations=100000)
+    corpus = None
+    rows = []
+    for engine, function in runs.items():
+        if engine.endswith("-dict"):
+            if len(graph) > LEGACY_LIMIT:
+                continue
+            if corpus is None:
+                corpus = graph.to_corpus()
+        (ranks, iterations, samples), seconds, peak = measure(
+            lambda: function(graph, corpus), trace_memory
+        )
+        error = np.abs(ranks - reference)
+        rows.append({
+            "corpus": name,
+            "pages": len(graph),
+            "links": len(graph.targets),
+            "engine": engine,
+            "seconds": seconds,
+            "memory_kb": peak / 1024 if peak is not None else None,
+            "iterations": iterations,
+            "samples": samples,
+            "l1_error": float(error.sum()),
+            "max_error": float(error.max()),
+        })
+    return rows
+
+
+def crawl_rows(name, graph, processes, trace_memory=False):
+    """
+    Write `graph` out as HTML and return rows timing a sequential crawl
+    and a crawl with `processes` worker processes.
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(graph, directory)
+        for engine, count in (("crawl", 1), ("crawl-parallel", processes)):
+            _, seconds, peak = measure(lambda: pagerank.crawl(directory, count), trace_memory)
+            rows.append({
+                "corpus": name, "pages": len(graph), "links": len(graph.targets),
+                "engine": engine, "seconds": seconds,
+                "memory_kb": peak / 1024 if peak is not None else None,
+                "iterations": None, "samples": None, "l1_error": None, "max_error": None,
+            })
+    return rows
+
+
+def print_table(rows):
+    columns = ["corpus", "pages", "links", "engine", "seconds", "memory_kb",
+               "iterations", "samples", "l1_error", "max_error"]
+    cells = [[format_cell(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for r in cells:
+        print("  ".join(c.ljust(w) for c, w in zip(r, widths)))
+
+
+def format_cell(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3g}" if value < 0.01 else f"{value:.3f}"
+    return str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PageRank engines on synthetic corpora.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 20000, 200000])
+    parser.add_argument("--links", type=float, default=8, help="mean links per page")
+    parser.add_argument("--dangling", type=float, default=0.1, help="fraction of pages with no links")
+    parser.add_argument("--components", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=1000000, help="samples for sample-vector")
+    parser.add_argument("--engines", nargs="+", help="run only these engines")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory", action="store_true", help="trace peak memory per engine")
+    parser.add_argument("--crawl", action="store_true", help="also write the corpora as HTML and time crawling")
+    parser.add_argument("--processes", type=int, default=None, help="processes for the parallel crawl")
+    args = parser.parse_args()
+
+    runs = engines(args.samples, args.seed)
+    if args.engines:
+        unknown = set(args.engines) - set(runs)
+        if unknown:
+            parser.error(f"unknown engines: {', '.join(sorted(unknown))}")
+        runs = {name: runs[name] for name in args.engines}
+
+    rows = []
+    for pages in args.pages:
+        graph = synthetic_graph(pages, args.links, args.dangling, args.components, args.seed)
+        name = f"synthetic-{pages}"
+        rows += run(name, graph, runs, args.memory)
+        if args.crawl:
+            rows += crawl_rows(name, graph, args.processes, args.memory)
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import numpy as np
+
+# Default L1 residual at which a solver stops
+TOLERANCE = 1e-6
+
+# Default number of passes after which a solver gives up
+MAX_ITERATIONS = 1000
+
+# Number of page blocks updated in turn by a Gauss-Seidel sweep
+GAUSS_SEIDEL_BLOCKS = 64
+
+# Number of power iterations between extrapolation steps
+EXTRAPOLATION_PERIOD = 10
+
+
+class SolveStats():
+    """
+    Counters filled in by a solver: the method used, the number of
+    passes over the links, the L1 change in the last pass, and whether
+    that change fell under the tolerance.
+    """
+
+    def __init__(self):
+        self.method = None
+        self.iterations = 0
+        self.residual = None
+        self.converged = False
+
+    def as_dict(self):
+        return {
+            "method": self.method,
+            "iterations": self.iterations,
+            "residual": self.residual,
+            "converged": self.converged,
+        }
+
+
+def power_step(graph, damping_factor, ranks):
+    n = len(graph)
+    return (1 - damping_factor) / n + damping_factor * graph.propagate(ranks)
+
+
+def power(graph, damping_factor, ranks, tolerance, max_iterations, stats):
+    """
+    Plain power (Jacobi) iteration.
+    """
+    while stats.iterations < max_iterations:
+        new_ranks = power_step(graph, damping_factor, ranks)
+        stats.iterations += 1
+        stats.residual = float(np.abs(new_ranks - ranks).sum())
+        ranks = new_ranks
+        if stats.residual < tolerance:
+            stats.converged = True
+            break
+    return ranks
+
+
+def gauss_seidel(graph, damping_factor, ranks, tolerance, max_iterations, stats):
+    """
+    Block Gauss-Seidel sweeps. Pages are updated a block at a time, and
+    each block sees the values already updated earlier in the same sweep,
+    so changes spread through the graph faster than in power iteration.
+
+    Pages are dealt into blocks round-robin. Links between nearby pages,
+    common in a crawl sorted by name, then cross from one block to the
+    next, and a chain of such links is followed up to GAUSS_SEIDEL_BLOCKS
+    steps in a single sweep.
+    """
+    n = len(graph)
+    out_degree, dangling = graph.out_degree, graph.dangling
+    blocks = min(GAUSS_SEIDEL_BLOCKS, n)
+    order = np.argsort(np.arange(n) % blocks, kind="stable")
+    position = np.empty(n, dtype=np.int64)
+    position[order] = np.arange(n)
+
+    # Links sorted by the position of the page they point to
+    edges = np.argsort(position[graph.targets], kind="stable")
+    sources = graph.sources[edges]
+    targets = position[graph.targets][edges]
+    offsets = np.searchsorted(targets, np.arange(n + 1))
+    bounds = np.searchsorted(order % blocks, np.arange(blocks + 1))
+
+    ranks = ranks.copy()
+    while stats.iterations < max_iterations:
+        previous = ranks.copy()
+        dangling_rank = ranks[dangling].sum()
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            start, end = offsets[lo], offsets[hi]
+            block_sources = sources[start:end]
+            contributions = np.bincount(
+                targets[start:end] - lo,
+                weights=ranks[block_sources] / out_degree[block_sources],
+                minlength=hi - lo,
+            )
+            pages = order[lo:hi]
+            block = (1 - damping_factor) / n + damping_factor * (contributions + dangling_rank / n)
+            dangling_rank += (block - ranks[pages])[dangling[pages]].sum()
+            ranks[pages] = block
+        ranks /= ranks.sum()
+        stats.iterations += 1
+        stats.residual = float(np.abs(ranks - previous).sum())
+        if stats.residual < tolerance:
+            stats.converged = True
+            break
+    return ranks
+
+
+def aitken(history):
+    """
+    Return the componentwise Aitken delta-squared extrapolation of the
+    last three iterates. Only pages whose last two steps shrink
+    geometrically in the same direction are extrapolated, since
+    elsewhere the formula can overshoot badly.
+    """
+    x0, x1, x2 = history[-3:]
+    first, last = x1 - x0, x2 - x1
+    result = x2.copy()
+    usable = first != 0
+    ratio = np.zeros_like(first)
+    ratio[usable] = last[usable] / first[usable]
+    usable &= (ratio > 0) & (ratio < 1)
+    result[usable] += last[usable] * ratio[usable] / (1 - ratio[usable])
+    return result
+
+
+def quadratic(history):
+    """
+    Return the quadratic extrapolation of the last four iterates, which
+    removes the components of the two subdominant eigenvectors (Kamvar
+    et al., "Extrapolation Methods for Accelerating PageRank").
+    """
+    x0, x1, x2, x3 = history[-4:]
+    y = np.stack([x1 - x0, x2 - x0], axis=1)
+    gamma, *_ = np.linalg.lstsq(y, -(x3 - x0), rcond=None)
+    g1, g2, g3 = gamma[0], gamma[1], 1.0
+    return (g1 + g2 + g3) * x1 + (g2 + g3) * x2 + g3 * x3
+
+
+def extrapolated(extrapolate, needed):
+    """
+    Return a solver that runs power iteration and every
+    EXTRAPOLATION_PERIOD passes tries replacing the current iterate with
+    `extrapolate` applied to the last `needed` iterates. The extrapolated
+    vector is kept only if the pass after it changes less than the pass
+    before, so a poor extrapolation costs one pass rather than progress.
+    """
+    def solve(graph, damping_factor, ranks, tolerance, max_iterations, stats):
+        history = [ranks]
+        while stats.iterations < max_iterations:
+            new_ranks = power_step(graph, damping_factor, ranks)
+            stats.iterations += 1
+            stats.residual = float(np.abs(new_ranks - ranks).sum())
+            ranks = new_ranks
+            if stats.residual < tolerance:
+                stats.converged = True
+                break
+            history = history[-(needed - 1):] + [ranks]
+            if (stats.iterations % EXTRAPOLATION_PERIOD != 0 or len(history) < needed
+                    or stats.iterations >= max_iterations):
+                continue
+
+            candidate = np.maximum(extrapolate(history), 0)
+            candidate /= candidate.sum()
+            stepped = power_step(graph, damping_factor, candidate)
+            stats.iterations += 1
+            residual = float(np.abs(stepped - candidate).sum())
+            if residual < stats.residual:
+                ranks, stats.residual = stepped, residual
+                history = [ranks]
+                if residual < tolerance:
+                    stats.converged = True
+                    break
+        return ranks
+    return solve
+
+
+# Name -> solver for every convergence method
+METHODS = {
+    "power": power,
+    "gauss-seidel": gauss_seidel,
+    "aitken": extrapolated(aitken, 3),
+    "quadratic": extrapolated(quadratic, 4),
+}
+
+
+def solve(graph, damping_factor, method="power", tolerance=TOLERANCE,
+          max_iterations=MAX_ITERATIONS, ranks=None, stats=None):
+    """
+    Return an array of PageRank values for the pages of a LinkGraph,
+    computed with the named convergence `method`. Iteration stops once
+    the L1 change over a pass is below `tolerance` or after
+    `max_iterations` passes; `stats`, if given, records which.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method {method!r}")
+    if stats is None:
+        stats = SolveStats()
+    stats.method = method
+    n = len(graph)
+    if n == 0:
+        stats.converged = True
+        return np.zeros(0)
+    if ranks is None:
+        ranks = np.full(n, 1 / n)
+    return METHODS[method](graph, damping_factor, ranks, tolerance, max_iterations, stats)
@@ -0,0 +1,76 @@
+import codecs
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Number of bytes scanned for links at a time
+CHUNK_SIZE = 1 << 16
+
+# Number of files handed to a worker process at a time
+FILES_PER_TASK = 256
+
+# An <a> tag with an href, capturing the link
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# The start of an <a> tag with an href that is cut off at the end of the text
+PARTIAL_LINK = re.compile(r"<(?:a(?:\s+[^>]*?(?:href=\"[^\"]*)?)?)?\Z")
+
+
+def extract_links(filename, chunk_size=CHUNK_SIZE):
+    """
+    Return the set of links in an HTML file, scanning it a chunk at a
+    time so that large pages are never held in memory whole. A tag cut
+    off at the end of a chunk is carried over to the next one, so links
+    split across chunks are still found.
+    """
+    links = set()
+    tail = ""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with open(filename, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            final = len(data) < chunk_size
+            text = tail + decoder.decode(data, final)
+            links.update(LINK.findall(text))
+            if final:
+                return links
+            partial = PARTIAL_LINK.search(text)
+            tail = text[partial.start():] if partial else ""
+
+
+def extract_shard(directory, filenames):
+    return [
+        (filename, extract_links(os.path.join(directory, filename)))
+        for filename in filenames
+    ]
+
+
+def html_files(directory):
+    return sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    )
+
+
+def crawl_pages(directory, processes=1, filenames=None):
+    """
+    Return a dictionary mapping each HTML page in `directory` (or just
+    `filenames`, if given) to the set of every link found in it. With
+    more than one process the listing is split into shards that are
+    parsed in a process pool; `processes=None` uses one per CPU.
+    """
+    if filenames is None:
+        filenames = html_files(directory)
+    if processes == 1 or len(filenames) <= FILES_PER_TASK:
+        return dict(extract_shard(directory, filenames))
+
+    shards = [
+        filenames[i:i + FILES_PER_TASK]
+        for i in range(0, len(filenames), FILES_PER_TASK)
+    ]
+    pages = dict()
+    with ProcessPoolExecutor(processes) as executor:
+        results = executor.map(extract_shard, [directory] * len(shards), shards)
+        for shard in results:
+            pages.update(shard)
+    return pages
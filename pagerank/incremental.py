@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from convergence import TOLERANCE, solve
+from crawler import crawl_pages, html_files
+from linkgraph import LinkGraph
+from pagerank import DAMPING, link_corpus
+
+# Name of the file, inside the corpus directory, holding the saved state
+STATE_FILENAME = ".pagerank-state.json"
+VERSION = 1
+
+
+class CorpusState():
+    """
+    What is known about a corpus directory from the last ranking: for
+    every page its size, modification time, content hash and raw links,
+    and the PageRank values computed then.
+    """
+
+    def __init__(self, files, ranks):
+        self.files = files
+        self.ranks = ranks
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read a state written by `save`, or return None if the file is
+        missing, unreadable or was written by another version.
+        """
+        try:
+            with open(filename, encoding="utf-8") as f:
+                data = json.load(f)
+            if data["version"] != VERSION:
+                return None
+            return cls(data["files"], data["ranks"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, filename):
+        temporary = filename + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "files": self.files, "ranks": self.ranks}, f)
+        os.replace(temporary, filename)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def refresh(directory, state, processes=1):
+    """
+    Return the raw links of every page in `directory` and the updated
+    per-file records, re-parsing only the pages that are new or whose
+    contents changed since `state`. A page whose modification time moved
+    but whose hash did not is not parsed again. Also returns the set of
+    pages that were added, changed or removed.
+    """
+    previous = state.files if state is not None else dict()
+    files = dict()
+    pages = dict()
+    stale = []
+    for filename in html_files(directory):
+        path = os.path.join(directory, filename)
+        info = os.stat(path)
+        record = previous.get(filename)
+        if (record is not None and record["size"] == info.st_size
+                and record["mtime_ns"] == info.st_mtime_ns):
+            files[filename] = record
+            pages[filename] = set(record["links"])
+            continue
+        digest = file_digest(path)
+        if record is not None and record["sha256"] == digest:
+            files[filename] = dict(record, size=info.st_size, mtime_ns=info.st_mtime_ns)
+            pages[filename] = set(record["links"])
+            continue
+        files[filename] = {"size": info.st_size, "mtime_ns": info.st_mtime_ns, "sha256": digest}
+        stale.append(filename)
+
+    for filename, links in crawl_pages(directory, processes, stale).items():
+        files[filename]["links"] = sorted(links)
+        pages[filename] = links
+
+    changed = set(stale) | (set(previous) - set(files))
+    return pages, files, changed
+
+
+def incremental_pagerank(directory, damping_factor=DAMPING, state_file=None,
+                         processes=1, method="power", tolerance=TOLERANCE, stats=None):
+    """
+    Return PageRank values for the pages in `directory` and the set of
+    pages that changed since the last call, saving state for the next one.
+
+    Only changed pages are parsed again, and the convergence `method`
+    starts from the previously saved ranks (new pages get an even share).
+    It runs to the same L1 `tolerance` as a full run, so a small edit to
+    a large corpus reaches the same ranks in fewer passes, and errors do
+    not build up over repeated updates. `stats`, a SolveStats, records
+    the passes used, if given.
+    """
+    if state_file is None:
+        state_file = os.path.join(directory, STATE_FILENAME)
+    state = CorpusState.load(state_file)
+    pages, files, changed = refresh(directory, state, processes)
+    if not pages:
+        return dict(), changed
+
+    graph = LinkGraph.from_corpus(link_corpus(pages))
+    ranks = None
+    if state is not None:
+        ranks = np.array([state.ranks.get(name, 1 / len(graph)) for name in graph.names])
+        ranks /= ranks.sum()
+    ranks = graph.to_dict(solve(graph, damping_factor, method, tolerance,
+                                ranks=ranks, stats=stats))
+
+    CorpusState(files, ranks).save(state_file)
+    return ranks, changed
@@ -0,0 +1,199 @@
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"PRGRAPH\0"
+VERSION = 1
+
+# Arrays stored in a saved graph, and their NumPy types
+SECTIONS = {
+    "offsets": "<i8",
+    "targets": "<i4",
+    "name_offsets": "<i8",
+    "name_blob": "u1",
+}
+
+
+class LinkGraph():
+    """
+    Compact form of a crawled corpus.
+
+    Pages are interned to dense integers in sorted name order. The links
+    of page `i` are `targets[offsets[i]:offsets[i + 1]]`, and `sources`
+    holds the page each of those links comes from, so the whole link
+    structure can be pushed through NumPy in one pass.
+    """
+
+    def __init__(self, names, offsets, targets):
+        self.names = names
+        self.offsets = offsets
+        self.targets = targets
+        self.out_degree = np.diff(offsets)
+        self.sources = np.repeat(
+            np.arange(len(names), dtype=np.int32), self.out_degree
+        )
+        self.dangling = self.out_degree == 0
+        self._index = None
+        self._incoming = None
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a LinkGraph from a `crawl` dictionary of page -> set of pages.
+        """
+        names = sorted(corpus)
+        index = {name: i for i, name in enumerate(names)}
+        offsets = np.zeros(len(names) + 1, dtype=np.int64)
+        targets = []
+        for i, name in enumerate(names):
+            links = sorted(index[link] for link in corpus[name] if link in index)
+            targets.extend(links)
+            offsets[i + 1] = len(targets)
+        graph = cls(names, offsets, np.array(targets, dtype=np.int32))
+        graph._index = index
+        return graph
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read a graph written by `save`. The link arrays are memory-mapped
+        rather than read, so loading costs little beyond the name table.
+        Raises ValueError if the file is not a saved graph of this version.
+        """
+        with open(filename, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{filename} is not a saved link graph")
+            version, length = struct.unpack("<II", f.read(8))
+            if version != VERSION:
+                raise ValueError(f"{filename} has unsupported version {version}")
+            header = json.loads(f.read(length).decode("utf-8"))
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        arrays = dict()
+        for name, (position, count) in header["sections"].items():
+            arrays[name] = np.frombuffer(
+                data, dtype=SECTIONS[name], count=count, offset=header["start"] + position
+            )
+        blob = arrays["name_blob"].tobytes()
+        name_offsets = arrays["name_offsets"]
+        names = [
+            blob[name_offsets[i]:name_offsets[i + 1]].decode("utf-8")
+            for i in range(len(name_offsets) - 1)
+        ]
+        return cls(names, arrays["offsets"], arrays["targets"])
+
+    def save(self, filename):
+        """
+        Write the graph to `filename` in a compact binary form that
+        `load` can memory-map: a header followed by the CSR arrays and
+        the name table, each 8-byte aligned. The file is written to a
+        temporary name and moved into place.
+        """
+        encoded = [name.encode("utf-8") for name in self.names]
+        name_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(name) for name in encoded], out=name_offsets[1:])
+        arrays = {
+            "offsets": np.asarray(self.offsets),
+            "targets": np.asarray(self.targets),
+            "name_offsets": name_offsets,
+            "name_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        }
+
+        table = dict()
+        position = 0
+        for name, dtype in SECTIONS.items():
+            arrays[name] = arrays[name].astype(dtype, copy=False)
+            table[name] = [position, len(arrays[name])]
+            position = align(position + arrays[name].nbytes)
+        header = {"version": VERSION, "sections": table, "start": 0}
+        # The start offset is part of the header, so size it with a placeholder
+        length = len(json.dumps(header)) + 20
+        header["start"] = align(len(MAGIC) + 8 + length)
+        encoded_header = json.dumps(header).encode("utf-8").ljust(length)
+
+        temporary = filename + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<II", VERSION, length))
+            f.write(encoded_header)
+            for name in SECTIONS:
+                f.seek(header["start"] + table[name][0])
+                f.write(arrays[name].tobytes())
+        os.replace(temporary, filename)
+
+    def to_corpus(self):
+        """
+        Return the graph as a `crawl` dictionary of page -> set of pages.
+        """
+        return {
+            name: set(self.names[j] for j in self.links(i))
+            for i, name in enumerate(self.names)
+        }
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {name: i for i, name in enumerate(self.names)}
+        return self._index
+
+    def links(self, i):
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def incoming(self):
+        """
+        Return the links ordered by the page they point to, as arrays of
+        sources and targets plus offsets such that the links into pages
+        `lo` to `hi - 1` are `in_offsets[lo]:in_offsets[hi]`.
+        """
+        if self._incoming is None:
+            order = np.argsort(self.targets, kind="stable")
+            in_targets = np.asarray(self.targets)[order]
+            in_offsets = np.zeros(len(self.names) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(in_targets, minlength=len(self.names)), out=in_offsets[1:])
+            self._incoming = (self.sources[order], in_targets, in_offsets)
+        return self._incoming
+
+    def to_dict(self, ranks):
+        """
+        Return a dictionary mapping page names to values of `ranks`.
+        """
+        return {name: float(rank) for name, rank in zip(self.names, ranks)}
+
+    def propagate(self, ranks):
+        """
+        Return A @ ranks for the column-stochastic link matrix A, where
+        each page splits its rank evenly over its links and a page with
+        no links splits it evenly over every page.
+        """
+        n = len(self.names)
+        share = np.zeros(n)
+        linked = ~self.dangling
+        share[linked] = ranks[linked] / self.out_degree[linked]
+        result = np.bincount(self.targets, weights=share[self.sources], minlength=n)
+        result += ranks[self.dangling].sum() / n
+        return result
+
+    def propagate_rows(self, ranks):
+        """
+        Return the rank each page receives over links when every row of
+        the (k x pages) array `ranks` is split evenly over each page's
+        links. Rank held by pages with no links is not passed on.
+        """
+        n = len(self.names)
+        in_sources, in_targets, _ = self.incoming()
+        linked = ~self.dangling
+        share = np.zeros_like(ranks)
+        share[:, linked] = ranks[:, linked] / self.out_degree[linked]
+        result = np.empty_like(ranks)
+        for row in range(len(ranks)):
+            result[row] = np.bincount(in_targets, weights=share[row][in_sources], minlength=n)
+        return result
+
+def align(position):
+    return (position + 7) // 8 * 8
@@ -0,0 +1,134 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from pagerank import DAMPING, SURFERS, link_graph, start_surfers, surf
+
+# Default half-width of the confidence interval at which sampling stops
+ERROR_TOLERANCE = 0.001
+
+# Default number of samples drawn between checks
+BATCH_SAMPLES = 1 << 20
+
+# Default number of samples after which sampling gives up
+MAX_SAMPLES = 1 << 28
+
+# Fewest batches before their spread is trusted as an error estimate
+MIN_BATCHES = 5
+
+# Number of checks running with the same top pages for them to be stable
+STABLE_CHECKS = 3
+
+
+class SampleStats():
+    """
+    Counters filled in by Monte Carlo PageRank: how many samples and
+    batches were drawn, the widest confidence half-width at the end, and
+    why sampling stopped ("tolerance", "top-k" or "max-samples").
+    """
+
+    def __init__(self):
+        self.samples = 0
+        self.batches = 0
+        self.max_error = None
+        self.stopped = None
+
+    def as_dict(self):
+        return {
+            "samples": self.samples,
+            "batches": self.batches,
+            "max_error": self.max_error,
+            "stopped": self.stopped,
+        }
+
+
+def monte_carlo_ranks(graph, damping_factor, tolerance=ERROR_TOLERANCE, top_k=None,
+                      confidence=0.95, batch_samples=BATCH_SAMPLES,
+                      max_samples=MAX_SAMPLES, seed=None, surfers=SURFERS, stats=None):
+    """
+    Return arrays of PageRank estimates for the pages of a LinkGraph and
+    the half-widths of their `confidence` intervals.
+
+    Surfers are advanced in batches of about `batch_samples` samples, and
+    each batch gives an independent estimate of every page's rank. The
+    spread of those estimates bounds the error of their mean. Sampling
+    stops once every half-width is within `tolerance`, or, if `top_k` is
+    given, once the `top_k` highest-ranked pages have come out in the
+    same order for STABLE_CHECKS batches running, or after `max_samples`.
+    """
+    if stats is None:
+        stats = SampleStats()
+    rng = np.random.default_rng(seed)
+    size = len(graph)
+    surfers = max(1, min(surfers, batch_samples))
+    steps = max(1, batch_samples // surfers)
+
+    pages = start_surfers(graph, damping_factor, surfers, rng)
+    total = np.zeros(size)
+    total_squares = np.zeros(size)
+    top = None
+    stable = 0
+    while True:
+        counts, pages = surf(graph, damping_factor, pages, steps, rng)
+        estimate = counts / counts.sum()
+        total += estimate
+        total_squares += estimate ** 2
+        stats.batches += 1
+        stats.samples += steps * surfers
+
+        batches = stats.batches
+        ranks = total / batches
+        if batches > 1:
+            variance = np.maximum(total_squares / batches - ranks ** 2, 0) * batches / (batches - 1)
+            error = t_quantile((1 + confidence) / 2, batches - 1) * np.sqrt(variance / batches)
+        else:
+            error = np.full(size, np.inf)
+        stats.max_error = float(error.max()) if size else 0.0
+
+        if top_k is not None:
+            current = np.argsort(-ranks, kind="stable")[:top_k]
+            stable = stable + 1 if top is not None and np.array_equal(current, top) else 0
+            top = current
+
+        if batches >= MIN_BATCHES and stats.max_error <= tolerance:
+            stats.stopped = "tolerance"
+        elif batches >= MIN_BATCHES and top_k is not None and stable >= STABLE_CHECKS:
+            stats.stopped = "top-k"
+        elif stats.samples >= max_samples:
+            stats.stopped = "max-samples"
+        if stats.stopped is not None:
+            return ranks, error
+
+
+def t_quantile(p, dof):
+    """
+    Return an approximation of the `p` quantile of Student's t
+    distribution with `dof` degrees of freedom (the Cornish-Fisher
+    expansion about the normal quantile), close enough for a handful of
+    batches.
+    """
+    z = NormalDist().inv_cdf(p)
+    return (z + (z ** 3 + z) / (4 * dof)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * dof ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * dof ** 3))
+
+
+def monte_carlo_pagerank(corpus, damping_factor=DAMPING, tolerance=ERROR_TOLERANCE,
+                         top_k=None, confidence=0.95, batch_samples=BATCH_SAMPLES,
+                         max_samples=MAX_SAMPLES, seed=None, stats=None):
+    """
+    Return PageRank estimates for each page of `corpus` (a `crawl`
+    dictionary or a LinkGraph) from as many random surfer samples as
+    `monte_carlo_ranks` needs, and a dictionary mapping each page to the
+    (low, high) bounds of its confidence interval.
+    """
+    graph = link_graph(corpus)
+    ranks, error = monte_carlo_ranks(
+        graph, damping_factor, tolerance, top_k, confidence, batch_samples,
+        max_samples, seed, stats=stats
+    )
+    intervals = {
+        name: (float(max(rank - half, 0)), float(min(rank + half, 1)))
+        for name, rank, half in zip(graph.names, ranks, error)
+    }
+    return graph.to_dict(ranks), intervals
@@ -0,0 +1,211 @@
+import json
+import os
+
+import numpy as np
+
+from convergence import MAX_ITERATIONS, TOLERANCE, SolveStats
+from crawler import extract_links, html_files
+
+VERSION = 1
+
+# Default number of pages whose incoming links share one block file
+BLOCK_PAGES = 1 << 16
+
+# Number of links buffered in memory before they are spilled to disk
+BUFFER_LINKS = 1 << 22
+
+# Number of pages read at a time when copying a LinkGraph
+GRAPH_CHUNK = 1 << 16
+
+
+class EdgeStore():
+    """
+    Links kept on disk for graphs too large to hold in memory.
+
+    The store is a directory. `header.json` describes it, `names.txt`
+    lists the pages one per line, and `out_degree.npy` holds each page's
+    number of links. The links themselves are (source, target) pairs
+    of int32 split into block files by target page, each block covering
+    `block_pages` pages and sorted by target, so a PageRank sweep reads
+    every block once, in order, and fills in one slice of the new ranks
+    per block.
+    """
+
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+
+    @classmethod
+    def open(cls, path):
+        """
+        Open the store in `path`. Raises ValueError if it is missing or
+        was written by another version.
+        """
+        try:
+            with open(os.path.join(path, "header.json"), encoding="utf-8") as f:
+                header = json.load(f)
+        except (OSError, ValueError):
+            raise ValueError(f"{path} is not an edge store")
+        if header.get("version") != VERSION:
+            raise ValueError(f"{path} has unsupported version {header.get('version')}")
+        return cls(path, header)
+
+    @classmethod
+    def from_rows(cls, path, names, rows, block_pages=BLOCK_PAGES):
+        """
+        Write a store to `path` for pages `names` from `rows`, an iterable
+        of (source indices, target indices) arrays, and return it. At most
+        BUFFER_LINKS links are held in memory: full buffers are spread
+        into one spill file per block, and each block is then sorted on
+        its own.
+        """
+        os.makedirs(path, exist_ok=True)
+        n = len(names)
+        blocks = max(1, -(-n // block_pages))
+        spills = [os.path.join(path, f"block-{b:05}.spill") for b in range(blocks)]
+        for spill in spills:
+            open(spill, "wb").close()
+
+        buffer = np.empty((BUFFER_LINKS, 2), dtype=np.int32)
+        used = 0
+
+        def spill_buffer(used):
+            pairs = buffer[:used]
+            block = pairs[:, 1] // block_pages
+            order = np.argsort(block, kind="stable")
+            bounds = np.searchsorted(block[order], np.arange(blocks + 1))
+            for b in range(blocks):
+                if bounds[b + 1] > bounds[b]:
+                    with open(spills[b], "ab") as f:
+                        pairs[order[bounds[b]:bounds[b + 1]]].tofile(f)
+
+        for sources, targets in rows:
+            sources = np.asarray(sources, dtype=np.int32)
+            targets = np.asarray(targets, dtype=np.int32)
+            start = 0
+            while start < len(sources):
+                take = min(len(sources) - start, BUFFER_LINKS - used)
+                buffer[used:used + take, 0] = sources[start:start + take]
+                buffer[used:used + take, 1] = targets[start:start + take]
+                used += take
+                start += take
+                if used == BUFFER_LINKS:
+                    spill_buffer(used)
+                    used = 0
+        if used:
+            spill_buffer(used)
+
+        table = []
+        links = 0
+        out_degree = np.zeros(n, dtype=np.int32)
+        for b, spill in enumerate(spills):
+            pairs = np.fromfile(spill, dtype=np.int32).reshape(-1, 2)
+            pairs = pairs[np.argsort(pairs[:, 1], kind="stable")]
+            out_degree += np.bincount(pairs[:, 0], minlength=n).astype(np.int32)
+            pairs.tofile(os.path.join(path, f"block-{b:05}.edges"))
+            os.remove(spill)
+            table.append([b * block_pages, min(n, (b + 1) * block_pages), len(pairs)])
+            links += len(pairs)
+
+        np.save(os.path.join(path, "out_degree.npy"), out_degree)
+        with open(os.path.join(path, "names.txt"), "w", encoding="utf-8") as f:
+            for name in names:
+                f.write(name + "\n")
+        header = {"version": VERSION, "pages": n, "links": links,
+                  "block_pages": block_pages, "blocks": table}
+        with open(os.path.join(path, "header.json"), "w", encoding="utf-8") as f:
+            json.dump(header, f)
+        return cls(path, header)
+
+    @classmethod
+    def from_html(cls, path, directory, block_pages=BLOCK_PAGES):
+        """
+        Write a store for the HTML pages in `directory`, parsing them one
+        at a time so that the link structure is never held in memory.
+        Links to the page itself or to pages outside the corpus are
+        dropped, as by `crawl`.
+        """
+        names = html_files(directory)
+        index = {name: i for i, name in enumerate(names)}
+
+        def rows():
+            for i, name in enumerate(names):
+                links = extract_links(os.path.join(directory, name))
+                targets = sorted(index[link] for link in links if link in index and link != name)
+                yield np.full(len(targets), i), targets
+
+        return cls.from_rows(path, names, rows(), block_pages)
+
+    @classmethod
+    def from_graph(cls, path, graph, block_pages=BLOCK_PAGES):
+        """
+        Write a store for a LinkGraph, such as one memory-mapped by
+        LinkGraph.load, a chunk of pages at a time.
+        """
+        def rows():
+            for lo in range(0, len(graph), GRAPH_CHUNK):
+                hi = min(len(graph), lo + GRAPH_CHUNK)
+                start, end = graph.offsets[lo], graph.offsets[hi]
+                degree = np.diff(graph.offsets[lo:hi + 1])
+                yield np.repeat(np.arange(lo, hi), degree), graph.targets[start:end]
+
+        return cls.from_rows(path, graph.names, rows(), block_pages)
+
+    def __len__(self):
+        return self.header["pages"]
+
+    @property
+    def names(self):
+        with open(os.path.join(self.path, "names.txt"), encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def out_degree(self):
+        return np.load(os.path.join(self.path, "out_degree.npy"))
+
+    def blocks(self):
+        """
+        Yield (lo, hi, sources, targets) for each block in order, where
+        the block holds every link into pages `lo` to `hi - 1`.
+        """
+        for b, (lo, hi, count) in enumerate(self.header["blocks"]):
+            pairs = np.fromfile(os.path.join(self.path, f"block-{b:05}.edges"), dtype=np.int32)
+            pairs = pairs.reshape(-1, 2)
+            yield lo, hi, pairs[:, 0], pairs[:, 1]
+
+    def to_dict(self, ranks):
+        return {name: float(rank) for name, rank in zip(self.names, ranks)}
+
+
+def stream_pagerank(store, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, stats=None):
+    """
+    Return an array of PageRank values for the pages of an EdgeStore by
+    power iteration, stopping like `matrix_pagerank` once the L1 change
+    over a pass is below `tolerance`. Each pass reads the
+    block files in order, and only a few vectors the size of the page
+    count are held in memory.
+    """
+    if stats is None:
+        stats = SolveStats()
+    stats.method = "stream"
+    n = len(store)
+    out_degree = store.out_degree()
+    dangling = out_degree == 0
+    linked = ~dangling
+    ranks = np.full(n, 1 / n)
+    share = np.zeros(n)
+    while stats.iterations < max_iterations:
+        share[linked] = ranks[linked] / out_degree[linked]
+        new_ranks = np.empty(n)
+        for lo, hi, sources, targets in store.blocks():
+            new_ranks[lo:hi] = np.bincount(targets - lo, weights=share[sources], minlength=hi - lo)
+        new_ranks += ranks[dangling].sum() / n
+        new_ranks *= damping_factor
+        new_ranks += (1 - damping_factor) / n
+        stats.iterations += 1
+        stats.residual = float(np.abs(new_ranks - ranks).sum())
+        ranks = new_ranks
+        if stats.residual < tolerance:
+            stats.converged = True
+            break
+    return ranks
@@ -1,20 +1,53 @@
+import argparse
+import math
 import os
 import random
-import re
-import sys
 import numpy as np
 
+from convergence import MAX_ITERATIONS, TOLERANCE, solve
+from crawler import crawl_pages
+from linkgraph import LinkGraph
+from outofcore import EdgeStore, stream_pagerank
+
 Directory = os.getcwd() + '/corpus0'
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Number of random surfers advanced together by the vector sampler
+SURFERS = 4096
+
+# Number of visits buffered by the vector sampler before counting them
+SAMPLE_BLOCK = 1 << 20
+
+# Weight the starting pages may still carry when vector surfers start counting
+BURN_IN_ERROR = 1e-4
+
 
 
 def main():
-    #if len(sys.argv) != 2:
-        #sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl("corpus1")
+    parser = argparse.ArgumentParser(description="Rank a corpus of HTML pages.")
+    parser.add_argument("corpus", nargs="?", default="corpus1",
+                        help="corpus directory, or a link graph saved by crawl(graph_file=...)")
+    parser.add_argument("--out-of-core", metavar="STORE",
+                        help="keep the links on disk in directory STORE and rank them there")
+    args = parser.parse_args()
+
+    if args.out_of_core:
+        if os.path.isfile(args.corpus):
+            store = EdgeStore.from_graph(args.out_of_core, LinkGraph.load(args.corpus))
+        else:
+            store = EdgeStore.from_html(args.out_of_core, args.corpus)
+        ranks = store.to_dict(stream_pagerank(store, DAMPING))
+        print(f"PageRank Results from Iteration (out of core)")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+        return
+
+    if os.path.isfile(args.corpus):
+        corpus = LinkGraph.load(args.corpus)
+    else:
+        corpus = crawl(args.corpus)
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
@@ -25,31 +58,45 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, processes=1, graph_file=None):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    Pages are parsed in `processes` worker processes (one per CPU if
+    None), which pays off for directories of many thousands of files.
+    If `graph_file` is given, the corpus is also saved there as a compact
+    LinkGraph that later runs can load instead of parsing HTML again.
+    """
+    corpus = link_corpus(crawl_pages(directory, processes))
+    if graph_file is not None:
+        LinkGraph.from_corpus(corpus).save(graph_file)
+    return corpus
+
+
+def link_corpus(pages):
+    """
+    Return a corpus dictionary from a dictionary mapping each page to
+    every link found in it, dropping links to the page itself and to
+    pages outside the corpus.
     """
-    pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
+    return {
+        filename: set(
+            link for link in links
+            if link in pages and link != filename
         )
+        for filename, links in pages.items()
+    }
 
-    return pages
+
+def link_graph(corpus):
+    """
+    Return `corpus` as a LinkGraph, building one if it is a dictionary.
+    """
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    return LinkGraph.from_corpus(corpus)
 
 
 def transition_model(corpus, page, damping_factor):
@@ -76,7 +123,7 @@ def transition_model(corpus, page, damping_factor):
     return prob_distribution
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, engine="vector", seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -84,7 +131,22 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    The default "vector" engine walks many surfers at once over a
+    LinkGraph and is reproducible for a given `seed`. The "dict" engine
+    is the original single-surfer implementation. `corpus` may also be
+    a LinkGraph.
     """
+    if engine == "vector":
+        if n < 1:
+            raise ValueError("n must be greater than or equal to 1")
+        graph = link_graph(corpus)
+        return graph.to_dict(sample_ranks(graph, damping_factor, n, seed))
+    if engine != "dict":
+        raise ValueError(f"unknown engine {engine!r}")
+    if isinstance(corpus, LinkGraph):
+        corpus = corpus.to_corpus()
+
     m = n
     if n < 1:
         return ' n must be greater than or equal to 1'
@@ -106,7 +168,68 @@ def sample_pagerank(corpus, damping_factor, n):
 
 
 
-def iterate_pagerank(corpus, damping_factor):
+def sample_ranks(graph, damping_factor, n, seed=None, surfers=SURFERS):
+    """
+    Return an array of PageRank estimates for the pages of a LinkGraph
+    from `n` random surfer samples, rounded up to a whole number of steps.
+
+    Each surfer starts on a random page. On every step all surfers move
+    together: those that teleport (or stand on a page with no links)
+    jump to a random page, and the rest follow a random link. Surfers
+    walk for a while before their visits are counted, since each one
+    takes only a few counted steps and should not remember where it began.
+    """
+    rng = np.random.default_rng(seed)
+    surfers = min(surfers, n)
+    pages = start_surfers(graph, damping_factor, surfers, rng)
+    counts, _ = surf(graph, damping_factor, pages, -(-n // surfers), rng)
+    return counts / counts.sum()
+
+
+def start_surfers(graph, damping_factor, surfers, rng):
+    """
+    Return the pages of `surfers` surfers that started on random pages
+    and walked until their starting page matters less than BURN_IN_ERROR.
+    """
+    pages = rng.integers(len(graph), size=surfers)
+    if 0 < damping_factor < 1:
+        steps = min(1000, math.ceil(math.log(BURN_IN_ERROR) / math.log(damping_factor)))
+        _, pages = surf(graph, damping_factor, pages, steps, rng)
+    return pages
+
+
+def surf(graph, damping_factor, pages, steps, rng):
+    """
+    Advance surfers standing on `pages` by `steps` steps using the NumPy
+    Generator `rng`. Return how many times each page was visited (each
+    step counts the pages the surfers are on before moving) and the
+    pages the surfers end on.
+    """
+    size = len(graph)
+    offsets, targets, out_degree = graph.offsets, graph.targets, graph.out_degree
+    surfers = len(pages)
+    counts = np.zeros(size, dtype=np.int64)
+    visits = np.empty((max(1, SAMPLE_BLOCK // surfers), surfers), dtype=np.int64)
+    row = 0
+    for step in range(steps):
+        visits[row] = pages
+        row += 1
+        if row == len(visits) or step == steps - 1:
+            counts += np.bincount(visits[:row].ravel(), minlength=size)
+            row = 0
+
+        follow = rng.random(surfers) < damping_factor
+        follow &= out_degree[pages] > 0
+        following = pages[follow]
+        pages = rng.integers(size, size=surfers)
+        pick = (rng.random(len(following)) * out_degree[following]).astype(np.int64)
+        pages[follow] = targets[offsets[following] + pick]
+
+    return counts, pages
+
+
+def iterate_pagerank(corpus, damping_factor, engine="matrix", method=None,
+                     tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS, stats=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -114,7 +237,30 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    The default "matrix" engine runs power iteration over a LinkGraph.
+    The "dict" engine is the original per-page implementation. `corpus`
+    may also be a LinkGraph.
+
+    If `method` names one of convergence.METHODS, the matrix engine uses
+    that method instead. Either way it stops once the L1 change over a
+    pass is below `tolerance` or gives up after `max_iterations` passes,
+    and records the iterations used in `stats`, a SolveStats, if given.
     """
+    if engine == "matrix":
+        graph = link_graph(corpus)
+        if method is None:
+            ranks = matrix_pagerank(graph, damping_factor, tolerance, max_iterations=max_iterations,
+                                    stats=stats)
+        else:
+            ranks = solve(graph, damping_factor, method, tolerance, max_iterations,
+                          stats=stats)
+        return graph.to_dict(ranks)
+    if engine != "dict":
+        raise ValueError(f"unknown engine {engine!r}")
+    if isinstance(corpus, LinkGraph):
+        corpus = corpus.to_corpus()
+
     def calculate_pagerank( pageranks): 
         comp1 = (1 - damping_factor)/ len(corpus)
         new_pageranks = dict()
@@ -139,12 +285,20 @@ def iterate_pagerank(corpus, damping_factor):
     return pageranks
 
 
+def matrix_pagerank(graph, damping_factor, tolerance=TOLERANCE, ranks=None,
+                    max_iterations=MAX_ITERATIONS, stats=None):
+    """
+    Return an array of PageRank values for the pages of a LinkGraph by
+    power iteration, stopping once the L1 change over a pass is below
+    `tolerance` or after `max_iterations` passes. The L1 change does not
+    shrink with the page count the way each page's value does, so the
+    same tolerance serves small and large corpora. Pages with no links
+    are treated as linking to every page, so the values always sum to 1.
 
-    
-
-    
-
-
+    Iteration starts from `ranks` if given, otherwise from uniform ranks.
+    """
+    return solve(graph, damping_factor, "power", tolerance, max_iterations,
+                 ranks=ranks, stats=stats)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,84 @@
+import numpy as np
+
+from convergence import MAX_ITERATIONS, TOLERANCE, SolveStats
+from pagerank import DAMPING, link_graph
+
+
+def teleport_matrix(graph, teleports):
+    """
+    Return a (topics x pages) array whose rows are the teleport
+    distributions in `teleports`, a dictionary mapping each topic to
+    either an iterable of pages (weighted evenly) or a dictionary of
+    page -> weight. Each row is scaled to sum to 1.
+    """
+    matrix = np.zeros((len(teleports), len(graph)))
+    for row, pages in enumerate(teleports.values()):
+        if not isinstance(pages, dict):
+            pages = {page: 1 for page in pages}
+        for page, weight in pages.items():
+            if page not in graph.index:
+                raise KeyError(f"{page} is not in the corpus")
+            matrix[row, graph.index[page]] += weight
+        total = matrix[row].sum()
+        if total <= 0:
+            raise ValueError("every teleport distribution needs a positive weight")
+        matrix[row] /= total
+    return matrix
+
+
+def personalized_ranks(graph, damping_factor, teleport, tolerance=TOLERANCE,
+                       max_iterations=MAX_ITERATIONS, stats=None):
+    """
+    Return a (topics x pages) array of personalized PageRank values for
+    the LinkGraph `graph`, one row per row of `teleport`.
+
+    All topics are iterated together as one array, so each pass shares
+    the link arrays and the convergence test, and a topic drops out of
+    the pass once its L1 change is below `tolerance`. A surfer that
+    teleports, or stands on a page with no links, jumps according to its
+    topic's distribution.
+    """
+    if stats is None:
+        stats = SolveStats()
+    stats.method = "personalized"
+    dangling = graph.dangling
+    ranks = teleport.copy()
+    active = np.arange(len(teleport))
+    while len(active) and stats.iterations < max_iterations:
+        current, jump = ranks[active], teleport[active]
+        new_ranks = graph.propagate_rows(current)
+        new_ranks += jump * current[:, dangling].sum(axis=1, keepdims=True)
+        new_ranks *= damping_factor
+        new_ranks += (1 - damping_factor) * jump
+        change = np.abs(new_ranks - current).sum(axis=1)
+        ranks[active] = new_ranks
+        stats.iterations += 1
+        stats.residual = float(change.max())
+        active = active[change >= tolerance]
+    stats.converged = len(active) == 0
+    return ranks
+
+
+def personalized_pagerank(corpus, teleports, damping_factor=DAMPING, tolerance=TOLERANCE,
+                          max_iterations=MAX_ITERATIONS, stats=None):
+    """
+    Return a dictionary mapping each topic in `teleports` to its
+    personalized PageRank values, as a dictionary of page -> value
+    summing to 1. `corpus` is a `crawl` dictionary or a LinkGraph, and
+    `teleports` is as for `teleport_matrix`.
+    """
+    graph = link_graph(corpus)
+    teleport = teleport_matrix(graph, teleports)
+    ranks = personalized_ranks(graph, damping_factor, teleport, tolerance,
+                               max_iterations, stats)
+    return {
+        topic: graph.to_dict(ranks[row])
+        for row, topic in enumerate(teleports)
+    }
+
+
+def seed_teleports(pages):
+    """
+    Return teleports with one topic per page, teleporting only to it.
+    """
+    return {page: [page] for page in pages}